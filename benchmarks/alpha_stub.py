@@ -0,0 +1,109 @@
+"""Local stand-in for the Alpha Vantage TIME_SERIES_DAILY endpoint.
+
+Serves deterministic synthetic price histories, so benchmarks never touch the live
+API or its rate limits. Importing this module does not import the application.
+
+Usage:
+    stub = AlphaVantageStub(n_bars=6000).start()
+    ...  # point ALPHA_BASE_URL (or AlphaVantage(base_url=...)) at stub.url
+    stub.stop()
+"""
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+def synthetic_payload(n_bars: int = 6000, seed: int = 0) -> dict:
+    """Build a 'TIME_SERIES_DAILY' response with n_bars random bars, newest first."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2025-05-23", periods=n_bars)[::-1]
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, n_bars))
+    volume = rng.integers(100_000, 10_000_000, n_bars)
+    return {
+        "Meta Data": {"2. Symbol": "SYNTH", "4. Output Size": "Full size"},
+        "Time Series (Daily)": {
+            d.strftime("%Y-%m-%d"): {
+                "1. open": f"{c * 0.995:.4f}",
+                "2. high": f"{c * 1.01:.4f}",
+                "3. low": f"{c * 0.99:.4f}",
+                "4. close": f"{c:.4f}",
+                "5. volume": str(v)
+            }
+            for d, c, v in zip(dates, close, volume)
+        }
+    }
+
+def ticker_seed(ticker: str) -> int:
+    """Stable per-ticker seed, so every run serves the same history for a ticker."""
+    return zlib.crc32(ticker.encode("utf-8"))
+
+class AlphaVantageStub:
+    def __init__(self, n_bars: int = 6000, latency: float = 0.0):
+        """Initialize a stub server.
+
+        Args:
+            n_bars (int): Bars in a 'full' response ('compact' returns the newest 100). Defaults to 6000.
+            latency (float): Seconds to sleep before answering each request. Defaults to 0.
+        """
+        self.n_bars = n_bars
+        self.latency = latency
+        self.calls = 0
+        self._bodies = {}  # (ticker, output size) -> encoded response
+        self._lock = threading.Lock()
+        self._server = None
+
+    def body(self, ticker: str, output_size: str) -> bytes:
+        """Return the encoded response for a ticker, building it on first use."""
+        key = (ticker, output_size)
+        with self._lock:
+            if key not in self._bodies:
+                payload = synthetic_payload(self.n_bars, seed=ticker_seed(ticker))
+                if output_size == "compact":
+                    series = payload["Time Series (Daily)"]
+                    payload["Time Series (Daily)"] = dict(list(series.items())[:100])
+                payload["Meta Data"]["2. Symbol"] = ticker
+                self._bodies[key] = json.dumps(payload).encode("utf-8")
+            return self._bodies[key]
+
+    def start(self) -> "AlphaVantageStub":
+        """Serve on a free local port in a daemon thread."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.calls += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                query = parse_qs(urlparse(self.path).query)
+                if query.get("function", [""])[0] != "TIME_SERIES_DAILY" or "symbol" not in query:
+                    body = json.dumps({"Error Message": "Invalid API call."}).encode("utf-8")
+                else:
+                    body = stub.body(query["symbol"][0], query.get("outputsize", ["compact"])[0])
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as ALPHA_BASE_URL."""
+        return f"http://127.0.0.1:{self._server.server_port}/query"
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,64 @@
+"""Micro-benchmark of AlphaVantage daily response parsing.
+
+Compares the single-pass parser used by AlphaVantage.get_daily with the previous
+DataFrame-of-strings implementation on a full-history payload.
+
+Usage:
+    python benchmarks/bench_parse.py [--payload response.json] [--repeat 20]
+
+Without --payload a synthetic 6000-bar response is generated.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data import _parse_daily  # noqa: E402
+from alpha_stub import synthetic_payload  # noqa: E402
+
+def legacy_parse(stock_data: dict, ticker: str) -> pd.DataFrame:
+    """Parser used by get_daily before the single-pass implementation."""
+    df = pd.DataFrame.from_dict(stock_data, orient="index")
+    for col in ["1. open", "2. high", "3. low", "4. close", "5. volume"]:
+        if not pd.to_numeric(df[col], errors="coerce").notnull().all():
+            raise ValueError(f"Non-numeric data found in column '{col}' for ticker '{ticker}'")
+    df = df.astype({
+        "1. open": "float64",
+        "2. high": "float64",
+        "3. low": "float64",
+        "4. close": "float64",
+        "5. volume": "int64"
+    })
+    df.columns = [c.split(". ")[1] if ". " in c else c for c in df.columns]
+    df.index = pd.to_datetime(df.index)
+    df.index.name = "date"
+    return df[["open", "high", "low", "close", "volume"]]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload", help="Recorded TIME_SERIES_DAILY JSON response")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per parser")
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, encoding="utf-8") as f:
+            payload = json.load(f)
+    else:
+        payload = synthetic_payload()
+    stock_data = payload["Time Series (Daily)"]
+
+    pd.testing.assert_frame_equal(legacy_parse(stock_data, "SYNTH"), _parse_daily(stock_data, "SYNTH"))
+
+    legacy = min(timeit.repeat(lambda: legacy_parse(stock_data, "SYNTH"), number=1, repeat=args.repeat))
+    single_pass = min(timeit.repeat(lambda: _parse_daily(stock_data, "SYNTH"), number=1, repeat=args.repeat))
+    print(f"bars:        {len(stock_data)}")
+    print(f"legacy:      {legacy * 1000:8.2f} ms")
+    print(f"single-pass: {single_pass * 1000:8.2f} ms")
+    print(f"speedup:     {legacy / single_pass:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""Benchmark suite for the data, model and API layers.
+
+Runs against a local Alpha Vantage stub (see alpha_stub.py) and synthetic multi-ticker
+histories in a temporary directory, so results are reproducible and never touch the
+live API, the configured database or saved models. Each benchmark records min, median,
+mean, p95 and max wall time; results are written as JSON and can be compared with a
+previous run.
+
+Usage:
+    python benchmarks/bench_suite.py [--groups parse,storage,model,api] [--quick]
+                                     [--output bench_results.json]
+                                     [--compare baseline.json] [--tolerance 0.25]
+
+The exit status is 1 if any API request gets a non-2xx response or, with --compare, if
+any benchmark's median is slower than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from alpha_stub import AlphaVantageStub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GROUPS = ("parse", "storage", "model", "api")
+
+class Recorder:
+    def __init__(self, repeat: int):
+        """Collect timings of named benchmarks.
+
+        Args:
+            repeat (int): Default number of timed runs per benchmark.
+        """
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, group: str, name: str, func, repeat: int = None, warmup: int = 1,
+                setup=None, **params) -> dict:
+        """Time func() after warmup untimed calls; setup() runs untimed before every call.
+
+        Returns:
+            dict: The recorded result.
+        """
+        for _ in range(warmup):
+            if setup is not None:
+                setup()
+            func()
+        times = []
+        for _ in range(repeat or self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return self.add(group, name, times, **params)
+
+    def add(self, group: str, name: str, times: list, extra: dict = None, **params) -> dict:
+        """Record a benchmark from a list of durations in seconds."""
+        ordered = sorted(times)
+        result = {
+            "group": group,
+            "name": name,
+            "params": params,
+            "n": len(times),
+            "min": ordered[0],
+            "median": statistics.median(ordered),
+            "mean": statistics.fmean(ordered),
+            "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+            "max": ordered[-1],
+            "unit": "s"
+        }
+        if extra:
+            result.update(extra)
+        self.results.append(result)
+        label = " ".join(f"{key}={value}" for key, value in params.items())
+        print(f"{group:8} {name:24} {label:40} median {result['median'] * 1000:10.3f} ms  "
+              f"p95 {result['p95'] * 1000:10.3f} ms  (n={result['n']})")
+        return result
+
+def configure(workdir: str, stub_url: str, concurrency: int) -> None:
+    """Point the application settings at workdir and the stub. Must run before importing it.
+
+    The /fit and /predict queues are sized so that `concurrency` clients are never
+    rejected with 503, which would otherwise be timed as fast responses.
+    """
+    os.environ["DB_NAME"] = os.path.join(workdir, "bench.sqlite")
+    os.environ["MODEL_DIRECTORY"] = os.path.join(workdir, "models")
+    os.environ["PRICE_DIRECTORY"] = os.path.join(workdir, "prices")
+    os.environ["ALPHA_BASE_URL"] = stub_url
+    os.environ["ALPHA_CALLS_PER_MINUTE"] = "1000000"
+    os.environ["STORAGE_LAYOUT"] = "tables"
+    os.environ["FIT_QUEUE"] = str(concurrency)
+    os.environ["PREDICT_QUEUE"] = str(concurrency)
+    os.environ.setdefault("ALPHA_API_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.environ["DB_NAME"])
+    sys.path.insert(0, ROOT)
+
+def seed(tickers: list) -> None:
+    """Download every ticker from the stub into the benchmark database."""
+    import sqlite3
+    from config import settings
+    from data import AlphaVantage, build_repository
+
+    repo = build_repository(sqlite3.connect(settings.db_name), layout="tables")
+    api = AlphaVantage()
+    for ticker in tickers:
+        repo.insert_table(ticker, api.get_daily(ticker, output_size="full"), if_exists="replace")
+    repo.connection.close()
+
+def bench_parse(recorder: Recorder, stub: AlphaVantageStub, ticker: str) -> None:
+    """Alpha Vantage request plus parsing, and parsing alone."""
+    from data import AlphaVantage, _parse_daily
+
+    api = AlphaVantage()
+    recorder.measure("parse", "get_daily", lambda: api.get_daily(ticker, output_size="full"),
+                     bars=stub.n_bars)
+    recorder.measure("parse", "get_daily", lambda: api.get_daily(ticker, output_size="compact"), bars=100)
+    series = json.loads(stub.body(ticker, "full"))["Time Series (Daily)"]
+    recorder.measure("parse", "parse_daily", lambda: _parse_daily(series, ticker), bars=len(series))
+
+def bench_storage(recorder: Recorder, workdir: str, ticker: str) -> None:
+    """insert_table and read_table throughput for each storage layout."""
+    import sqlite3
+    from data import AlphaVantage, build_repository
+
+    records = AlphaVantage().get_daily(ticker, output_size="full")
+    rows = len(records)
+    layouts = ["tables", "prices"]
+    try:
+        import pyarrow  # noqa: F401
+        layouts.append("arrow")
+    except ImportError:
+        print("storage  pyarrow not installed, skipping the arrow layout")
+    for layout in layouts:
+        connection = sqlite3.connect(os.path.join(workdir, f"storage_{layout}.sqlite"), check_same_thread=False)
+        repo = build_repository(connection, layout=layout)
+        result = recorder.measure(
+            "storage", "insert_table", lambda: repo.insert_table(ticker, records, if_exists="replace"),
+            layout=layout, rows=rows
+        )
+        result["rows_per_second"] = rows / result["median"]
+        for limit, columns in [(None, None), (2001, None), (2001, ["close"])]:
+            n_rows = rows if limit is None else limit
+            result = recorder.measure(
+                "storage", "read_table", lambda: repo.read_table(ticker, limit=limit, columns=columns),
+                layout=layout, rows=n_rows, columns=",".join(columns or ["all"])
+            )
+            result["rows_per_second"] = n_rows / result["median"]
+        connection.close()
+
+def bench_model(recorder: Recorder, tickers: list, sizes: list, orders: list, fit_repeat: int) -> None:
+    """wrangle_data, fit, predict_volatility, dump and load on the seeded database."""
+    import sqlite3
+    from arch import arch_model
+    from config import settings
+    from data import build_repository
+    from model import GarchModel, GarchState, ModelCache, ReturnsCache
+
+    repo = build_repository(sqlite3.connect(settings.db_name), layout="tables")
+    ticker = tickers[0]
+    model = GarchModel(ticker, repo, use_new_data=False)
+
+    for n in sizes:
+        recorder.measure("model", "wrangle_data", lambda: model.wrangle_data(n), n_observations=n, cache="none")
+        returns_cache = ReturnsCache()
+        recorder.measure("model", "wrangle_data", lambda: model.wrangle_data(n, cache=returns_cache),
+                         n_observations=n, cache="warm")
+
+    for n in sizes:
+        model.wrangle_data(n)
+        for p, q in orders:
+            recorder.measure("model", "fit", lambda: model.fit(p=p, q=q), repeat=fit_repeat,
+                             n_observations=n, p=p, q=q)
+
+    model.wrangle_data(sizes[-1])
+    model.fit(p=1, q=1)
+    result = model.model
+    state = GarchState.from_result(result)
+    for horizon in (5, 30):
+        model.model = result
+        recorder.measure("model", "predict_volatility", lambda: model.predict_volatility(horizon),
+                         horizon=horizon, model="arch")
+        model.model = state
+        recorder.measure("model", "predict_volatility", lambda: model.predict_volatility(horizon),
+                         horizon=horizon, model="state")
+
+    model.model = result
+    recorder.measure("model", "dump", model.dump)
+    recorder.measure("model", "load", model.load, cache="none")
+    model_cache = ModelCache()
+    recorder.measure("model", "load", lambda: model.load(cache=model_cache), cache="warm")
+
+    # Reference: arch fit on the same returns without the repository round trips
+    returns = model.data
+    recorder.measure("model", "arch_fit", lambda: arch_model(returns, p=1, q=1, rescale=False).fit(disp=0),
+                     repeat=fit_repeat, n_observations=len(returns), p=1, q=1)
+    repo.connection.close()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def load_test(url: str, bodies: list, concurrency: int) -> tuple:
+    """POST every body to url from `concurrency` threads.
+
+    Returns:
+        tuple: (latencies in seconds of the 2xx responses, {status code: count}, total wall time).
+    """
+    import requests
+
+    local = threading.local()
+
+    def post(body: dict) -> tuple:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        response = local.session.post(url, json=body, timeout=300)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(post, bodies))
+    wall = time.perf_counter() - start
+    statuses = {}
+    for _, status in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return [latency for latency, status in outcomes if 200 <= status < 300], statuses, wall
+
+def bench_api(recorder: Recorder, tickers: list, n_requests: int, concurrency: int, n_observations: int) -> bool:
+    """End-to-end /fit and /predict latency under concurrent load, served by uvicorn.
+
+    Only 2xx responses are timed. Returns False if any request got another status.
+    """
+    import uvicorn
+    import main
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+
+    ok = True
+    try:
+        scenarios = [
+            ("fit", [{"ticker": tickers[i % len(tickers)], "use_new_data": False,
+                      "n_observations": n_observations, "p": 1, "q": 1} for i in range(n_requests)]),
+            ("predict", [{"ticker": tickers[i % len(tickers)], "n_days": 5} for i in range(n_requests)]),
+            ("predict", [{"ticker": tickers[i % len(tickers)], "n_days": 60} for i in range(n_requests)]),
+        ]
+        for endpoint, bodies in scenarios:
+            load_test(f"{base}/{endpoint}", bodies[:concurrency], concurrency)  # Warm up
+            latencies, statuses, wall = load_test(f"{base}/{endpoint}", bodies, concurrency)
+            params = {"concurrency": concurrency, "requests": len(bodies)}
+            if endpoint == "predict":
+                params["n_days"] = bodies[0]["n_days"]
+            failed = len(bodies) - len(latencies)
+            if failed:
+                ok = False
+                label = " ".join(f"{key}={value}" for key, value in params.items())
+                print(f"{'api':8} {endpoint:24} {label:40} FAILED {failed} non-2xx responses {statuses}")
+            if latencies:
+                recorder.add("api", endpoint, latencies,
+                             extra={"statuses": statuses, "non_2xx": failed,
+                                    "requests_per_second": len(bodies) / wall}, **params)
+    finally:
+        server.should_exit = True
+        thread.join()
+    return ok
+
+def environment() -> dict:
+    """Describe the machine, interpreter, library versions and commit."""
+    import arch
+    import numpy
+    import pandas
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "arch": arch.__version__
+    }
+
+def result_key(result: dict) -> tuple:
+    return result["group"], result["name"], tuple(sorted((k, str(v)) for k, v in result["params"].items()))
+
+def compare(results: list, baseline_path: str, tolerance: float) -> bool:
+    """Print median ratios against a baseline run. Returns True if nothing regressed."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+    ok = True
+    print(f"\nComparison with {baseline_path} (median, tolerance {tolerance:.0%}):")
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if previous is None:
+            continue
+        ratio = result["median"] / previous["median"]
+        regressed = ratio > 1 + tolerance or result.get("non_2xx", 0) > 0
+        ok = ok and not regressed
+        label = " ".join(f"{key}={value}" for key, value in result["params"].items())
+        print(f"{'REGRESSED' if regressed else 'ok':9} {result['group']:8} {result['name']:24} "
+              f"{label:40} {ratio:6.2f}x")
+    return ok
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", default=",".join(GROUPS), help="Comma-separated subset of " + ", ".join(GROUPS))
+    parser.add_argument("--tickers", type=int, default=4, help="Synthetic tickers to serve and store")
+    parser.add_argument("--bars", type=int, default=6000, help="Bars per ticker in a full response")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per micro-benchmark")
+    parser.add_argument("--fit-repeat", type=int, default=5, help="Timed runs per fit benchmark")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per API scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent API clients")
+    parser.add_argument("--quick", action="store_true", help="Small sizes and few repeats, for a smoke run")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Previous JSON results to compare medians against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a regression")
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.groups.split(",") if group.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+    if args.quick:
+        args.tickers, args.bars, args.repeat, args.fit_repeat = 2, 2500, 3, 2
+        args.requests, args.concurrency = 16, 4
+    api_ok = True
+    sizes = [500, 1000] if args.quick else [500, 1000, 2000]
+    orders = [(1, 1), (2, 1)] if args.quick else [(1, 1), (1, 2), (2, 1), (2, 2)]
+    tickers = [f"SYN{i}" for i in range(args.tickers)]
+
+    stub = AlphaVantageStub(n_bars=args.bars).start()
+    recorder = Recorder(repeat=args.repeat)
+    with tempfile.TemporaryDirectory(prefix="garch-bench-") as workdir:
+        configure(workdir, stub.url, args.concurrency)
+        logging.disable(logging.INFO)
+        warnings.simplefilter("ignore")
+        seed(tickers)
+        if "parse" in groups:
+            bench_parse(recorder, stub, tickers[0])
+        if "storage" in groups:
+            bench_storage(recorder, workdir, tickers[0])
+        if "model" in groups:
+            bench_model(recorder, tickers, sizes, orders, args.fit_repeat)
+        if "api" in groups:
+            api_ok = bench_api(recorder, tickers, args.requests, args.concurrency, n_observations=sizes[-1])
+    stub.stop()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "arguments": vars(args),
+        "results": recorder.results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(recorder.results)} results to {args.output}")
+
+    compared_ok = not args.compare or compare(recorder.results, args.compare, args.tolerance)
+    if not (api_ok and compared_ok):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,63 @@
 """Configuration module for the stock data analysis project.
 Extracts environment variables from .env file for use across the application.
+Settings are parsed on first access of `settings` (or get_settings()), not at import.
 """
 import os
+from functools import lru_cache
+from typing import List, Optional
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
-def return_full_path(filename: str = ".env") -> str:
-    """Returns the absolute path to the .env file"""
-    absolute_path = os.path.abspath(__file__)
-    directory_name = os.path.dirname(absolute_path)
-    full_path = os.path.join(directory_name, filename)
-    if not os.path.exists(full_path):
-        raise FileNotFoundError(f"The .env file was not found at: {full_path}")
-    return full_path
-
 class Settings(BaseSettings):
     """Uses pydantic to define settings for the project"""
     alpha_api_key: str
     db_name: str
     model_directory: str
     database_url: str
+    alpha_base_url: str = "https://www.alphavantage.co/query"
+    alpha_calls_per_minute: float = 5
+    alpha_timeout: float = 30.0  # Seconds
+    alpha_max_retries: int = 4
+    alpha_backoff: float = 2.0  # Seconds before the first retry, doubled each time
+    # Once /fit/batch is first used, its worker processes split this share of
+    # alpha_calls_per_minute and the API process keeps the rest, for as long as it runs
+    alpha_batch_share: float = Field(0.5, gt=0, lt=1)
+    db_readers: int = 4  # Read connections in the API's connection pool
+    db_busy_timeout: float = 5.0  # Seconds to wait on a locked database
+    storage_layout: str = "tables"  # 'tables' (one per ticker), 'prices' (normalized) or 'arrow'
+    price_directory: str = "prices"  # Arrow files of the 'arrow' storage layout
+    model_cache_size: int = 64
+    returns_cache_size: int = 64
+    incremental_sync: bool = True
+    forecast_max_horizon: int = 30  # Days precomputed by GarchModel.dump; 0 disables
+    refit_max_new_bars: int = 5  # New bars a warm refit may absorb without refitting
+    refit_loglik_threshold: float = 0.5  # Allowed change of average log-likelihood per bar
+    model_retention: int = 5  # Models kept per ticker after each dump; 0 keeps all
+    fit_processes: Optional[int] = None  # None uses one process per CPU
+    fit_batch_max_specs: int = 64  # Largest /fit/batch request
+    fit_batch_queue: int = 128  # Batch fits running or waiting across all /fit/batch requests
+    fit_workers: int = 2
+    fit_queue: int = 4
+    predict_workers: int = 8
+    predict_queue: int = 32
+    predict_batch_max_tickers: int = 256  # Largest /predict/batch request
+    profile_header: str = "X-Profile"  # Request header that turns on the Server-Timing breakdown
+    lazy_startup: bool = True  # Import the data and model layers on first use instead of at startup
+    prewarm_tickers: List[str] = []  # Models loaded into the cache in the background at startup
 
     model_config = {
         "protected_namespaces": ("settings_",),
-        "env_file": return_full_path(".env"),
+        "env_file": os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"),  # Optional
         "env_file_encoding": "utf-8"
     }
 
-# Create instance of Settings for importing in other modules
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Return the settings, parsing the environment and .env file on the first call."""
+    return Settings()
+
+def __getattr__(name: str):
+    # `from config import settings` keeps working, but parses settings only when first imported
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,24 +1,248 @@
+import asyncio
+import numpy as np
 import pandas as pd
 import requests
 import sqlite3
 import re
-from urllib.parse import urlencode
+import threading
 import time
 import logging
+import os
+import queue
+from contextlib import contextmanager
 from config import settings
+from metrics import API_CALLS, RATE_LIMIT_WAIT_SECONDS, record, timed
 
 # Global logging configuration for data.py; override in main script if needed
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keys of each daily bar in the API response, in output column order
+_DAILY_FIELDS = {
+    "open": "1. open",
+    "high": "2. high",
+    "low": "3. low",
+    "close": "4. close",
+    "volume": "5. volume"
+}
+
+# Price columns stored for each ticker, with their dtypes
+_COLUMN_DTYPES = {
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "int64"
+}
+
+def _validate_columns(columns: list) -> list:
+    """Return columns, or every price column if None, checking they are known price columns."""
+    if columns is None:
+        return list(_COLUMN_DTYPES)
+    if not isinstance(columns, list) or not columns or not set(columns) <= set(_COLUMN_DTYPES):
+        raise ValueError(f"Columns must be a non-empty list drawn from {list(_COLUMN_DTYPES)}")
+    return columns
+
+def _parse_daily(time_series: dict, ticker: str) -> pd.DataFrame:
+    """Convert the 'Time Series (Daily)' object of an API response to a typed DataFrame.
+
+    All price strings are parsed in one vectorised call into a float64 array, volumes
+    into int64 and dates straight into a DatetimeIndex, avoiding intermediate
+    DataFrames of strings.
+
+    Args:
+        time_series (dict): Maps 'YYYY-MM-DD' dates to dicts of field strings.
+        ticker (str): The stock ticker symbol, used in error messages.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns ['open', 'high', 'low', 'close', 'volume']
+                      indexed by date, in the order of the response.
+
+    Raises:
+        ValueError: If a field is missing or not numeric.
+    """
+    price_keys = list(_DAILY_FIELDS.values())[:4]
+    volume_key = _DAILY_FIELDS["volume"]
+    bars = time_series.values()
+    try:
+        prices = [bar[key] for bar in bars for key in price_keys]
+        volumes = [bar[volume_key] for bar in bars]
+    except KeyError as e:
+        raise ValueError(f"Missing field {e} in data for ticker '{ticker}'")
+
+    try:
+        prices = np.array(prices, dtype="float64").reshape(-1, len(price_keys))
+        volumes = np.array(volumes, dtype="int64")
+        bad_columns = [key for key, bad in zip(price_keys, np.isnan(prices).any(axis=0)) if bad]
+    except ValueError:
+        bad_columns = None
+    if bad_columns is None or bad_columns:
+        # Slow path only to name the offending column, as the original validation did
+        for key in price_keys + [volume_key]:
+            if not pd.to_numeric(pd.Series([bar[key] for bar in bars]), errors="coerce").notnull().all():
+                raise ValueError(f"Non-numeric data found in column '{key}' for ticker '{ticker}'")
+        raise ValueError(f"Non-integer data found in column '{volume_key}' for ticker '{ticker}'")
+
+    index = pd.DatetimeIndex(
+        np.array(list(time_series), dtype="datetime64[D]").astype("datetime64[ns]"), name="date"
+    )
+    df = pd.DataFrame(prices, index=index, columns=list(_DAILY_FIELDS)[:4])
+    df["volume"] = volumes
+    return df
+
+class TokenBucket:
+    def __init__(self, calls_per_minute: float, capacity: int = None):
+        """Initialize a thread-safe token-bucket rate limiter.
+
+        Args:
+            calls_per_minute (float): Sustained number of calls allowed per minute.
+            capacity (int, optional): Maximum burst size. Defaults to one call, i.e. calls
+                are spread evenly over the minute.
+
+        Raises:
+            ValueError: If calls_per_minute or capacity is not positive.
+        """
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute must be positive")
+        if capacity is not None and capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.rate = calls_per_minute / 60.0
+        self.capacity = float(capacity or 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now, so concurrent callers queue up behind each other
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+# Shared by every AlphaVantage client in the process, as the API quota is per key
+_rate_limiter = TokenBucket(calls_per_minute=settings.alpha_calls_per_minute)
+_session = None
+
+def _default_session() -> requests.Session:
+    """Return the process-wide pooled HTTP session, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+def share_rate_limit(fraction: float) -> None:
+    """Limit this process to a fraction of alpha_calls_per_minute and drop its pooled session.
+
+    Called in the API process and as the initializer of each /fit/batch worker process,
+    so that together they stay within the per-key quota. Clients created afterwards
+    use the new limiter.
+
+    Args:
+        fraction (float): Share of the quota for this process, in (0, 1].
+
+    Raises:
+        ValueError: If fraction is not in (0, 1].
+    """
+    global _rate_limiter, _session
+    if not 0 < fraction <= 1:
+        raise ValueError("fraction must be in (0, 1]")
+    _rate_limiter = TokenBucket(calls_per_minute=settings.alpha_calls_per_minute * fraction)
+    _session = None
+
 class AlphaVantage:
-    def __init__(self, api_key: str = settings.alpha_api_key):
+    def __init__(self, api_key: str = settings.alpha_api_key, base_url: str = settings.alpha_base_url,
+                 session: requests.Session = None, rate_limiter: TokenBucket = None,
+                 timeout: float = settings.alpha_timeout, max_retries: int = settings.alpha_max_retries,
+                 backoff: float = settings.alpha_backoff):
         """Initialize AlphaVantage API client.
 
         Args:
             api_key (str): Alpha Vantage API key. Defaults to settings.alpha_api_key.
+            base_url (str): Query endpoint. Defaults to settings.alpha_base_url.
+            session (requests.Session, optional): HTTP session. Defaults to a pooled session
+                shared by all clients.
+            rate_limiter (TokenBucket, optional): Limiter applied before every request. Defaults
+                to a limiter shared by all clients, tuned to settings.alpha_calls_per_minute.
+            timeout (float): Seconds to wait for the server. Defaults to settings.alpha_timeout.
+            max_retries (int): Retries after a rate-limit response, timeout, connection error or
+                5xx/429 status. Defaults to settings.alpha_max_retries.
+            backoff (float): Seconds before the first retry, doubled on each further retry.
+                Defaults to settings.alpha_backoff.
         """
         self._api_key = api_key
+        self._base_url = base_url
+        self._session = session if session is not None else _default_session()
+        self._rate_limiter = rate_limiter if rate_limiter is not None else _rate_limiter
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._backoff = backoff
+
+    def _query(self, params: dict) -> dict:
+        """Send a rate-limited query to the API, retrying transient failures with exponential backoff.
+
+        Args:
+            params (dict): Query parameters, without the API key.
+
+        Returns:
+            dict: Decoded JSON response.
+
+        Raises:
+            ValueError: If the request fails permanently or retries are exhausted.
+        """
+        params = {**params, "apikey": self._api_key}
+        error = None
+        for attempt in range(self._max_retries + 1):
+            if attempt:
+                delay = self._backoff * 2 ** (attempt - 1)
+                logger.info(f"{error} Retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+            waited = self._rate_limiter.acquire()
+            RATE_LIMIT_WAIT_SECONDS.observe(waited)
+            record("alpha.rate_limit_wait", waited)
+            try:
+                with timed("alpha.request"):
+                    response = self._session.get(self._base_url, params=params, timeout=self._timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    API_CALLS.inc(outcome=f"http_{response.status_code}")
+                    error = f"HTTP {response.status_code} from API."
+                    continue
+                response.raise_for_status()  # Raise for other 4xx errors
+                response_data = response.json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                timeout = isinstance(e, requests.exceptions.Timeout)
+                API_CALLS.inc(outcome="timeout" if timeout else "connection_error")
+                error = f"Request failed: {e}."
+                continue
+            except (requests.exceptions.RequestException, ValueError) as e:
+                API_CALLS.inc(outcome="error")
+                raise ValueError(f"Failed to fetch data for {params.get('symbol')}: {e}")
+
+            # Throttling messages come back with status 200
+            message = response_data.get("Note") or response_data.get("Information")
+            if message is not None and ("Note" in response_data or "rate limit" in message.lower()):
+                API_CALLS.inc(outcome="rate_limited")
+                error = "Rate limit reached."
+                continue
+            API_CALLS.inc(outcome="ok")
+            if "Information" in response_data:
+                raise ValueError(f"API Error: {response_data['Information']}")
+            return response_data
+        raise ValueError(
+            f"Failed to fetch data for {params.get('symbol')} after {self._max_retries + 1} attempts: {error}"
+        )
 
     def get_daily(self, ticker: str, output_size: str = "full") -> pd.DataFrame:
         """Get daily time series of an equity from Alpha Vantage API.
@@ -40,67 +264,192 @@ class AlphaVantage:
         if output_size not in ["compact", "full"]:
             raise ValueError("output_size must be 'compact' or 'full'")
 
-        # Construct URL
-        base_url = "https://www.alphavantage.co/query"
         params = {
             "function": "TIME_SERIES_DAILY",
             "symbol": ticker,
             "outputsize": output_size,
-            "datatype": "json",
-            "apikey": self._api_key
+            "datatype": "json"
         }
-        url = f"{base_url}?{urlencode(params)}"
+        response_data = self._query(params)
+
+        # Check for API errors
+        if "Error Message" in response_data:
+            raise ValueError(f"API Error: {response_data['Error Message']}")
+        if "Time Series (Daily)" not in response_data:
+            raise ValueError(f"Invalid API call. Check ticker symbol '{ticker}'")
+
+        with timed("alpha.parse"):
+            return _parse_daily(response_data["Time Series (Daily)"], ticker)
+
+    async def get_daily_many(self, tickers: list, repo: "SQLRepository" = None, concurrency: int = 4,
+                             output_size: str = "full", if_exists: str = "replace") -> dict:
+        """Download daily time series for many tickers concurrently.
 
-        # Send request to API
+        Up to `concurrency` requests are in flight at once, while the shared rate limiter
+        keeps the overall call rate within the API quota. When a repository is given, each
+        DataFrame is written to it as soon as it arrives and then released, so the whole
+        universe is never held in memory. Writes go through a worker thread when the
+        repository uses a ConnectionPool; a plain sqlite3 connection can only be used by
+        the thread that created it, so writes to it run on the event loop thread.
+
+        Args:
+            tickers (list): Stock ticker symbols.
+            repo (SQLRepository, optional): Repository to store each ticker's data in, as a
+                table named after the ticker. Defaults to None (return the DataFrames).
+            concurrency (int): Maximum number of simultaneous requests. Defaults to 4.
+            output_size (str): The size of the output ('compact' or 'full'). Defaults to 'full'.
+            if_exists (str): Passed to SQLRepository.insert_table. Defaults to 'replace'.
+
+        Returns:
+            dict: Maps each ticker to the result of SQLRepository.insert_table, or to its
+                DataFrame when repo is None. Failed downloads and writes map to a result dict
+                with 'transaction_successful' False and an 'error' message.
+
+        Raises:
+            ValueError: If concurrency is not a positive integer.
+        """
+        if not isinstance(concurrency, int) or concurrency <= 0:
+            raise ValueError("concurrency must be a positive integer")
+
+        semaphore = asyncio.Semaphore(concurrency)
+        write_lock = asyncio.Lock()  # The repository connection is not shared between writers
+        pooled = repo is not None and repo.pool is not None
+        results = {}
+
+        async def fetch(ticker: str) -> None:
+            async with semaphore:
+                try:
+                    records = await asyncio.to_thread(self.get_daily, ticker, output_size)
+                except ValueError as e:
+                    results[ticker] = {
+                        "transaction_successful": False,
+                        "records_inserted": 0,
+                        "error": str(e)
+                    }
+                    return
+            if repo is None:
+                results[ticker] = records
+                return
+            try:
+                if not pooled:
+                    results[ticker] = repo.insert_table(table_name=ticker, records=records, if_exists=if_exists)
+                    return
+                async with write_lock:
+                    results[ticker] = await asyncio.to_thread(
+                        repo.insert_table, table_name=ticker, records=records, if_exists=if_exists
+                    )
+            except ValueError as e:
+                # e.g. a ticker that is not a valid table name
+                results[ticker] = {
+                    "transaction_successful": False,
+                    "records_inserted": 0,
+                    "error": str(e)
+                }
+
+        await asyncio.gather(*(fetch(ticker) for ticker in dict.fromkeys(tickers)))
+        return results
+
+class ConnectionPool:
+    def __init__(self, database: str, readers: int = 4, busy_timeout: float = 5.0):
+        """Initialize a pool of SQLite connections with one writer and several readers.
+
+        The database is switched to WAL journaling, so readers never block the writer
+        or each other. Writes are serialised through a single connection guarded by a
+        lock, and each connection waits up to busy_timeout seconds on a locked database
+        instead of failing immediately. Every connection gets the same cache, memory-map
+        and temp-store pragmas that NormalizedSQLRepository applies to a plain connection.
+
+        Args:
+            database (str): Path of the SQLite database file.
+            readers (int): Number of read-only connections. Defaults to 4.
+            busy_timeout (float): Seconds to wait for a lock. Defaults to 5.0.
+
+        Raises:
+            ValueError: If readers is not a positive integer or database is in-memory.
+        """
+        if not isinstance(readers, int) or readers <= 0:
+            raise ValueError("readers must be a positive integer")
+        if database == ":memory:":
+            raise ValueError("An in-memory database cannot be shared between connections")
+        self.database = database
+        self.busy_timeout = busy_timeout
+        self.writer_connection = self._connect()
+        self.writer_connection.execute("PRAGMA journal_mode = WAL")
+        self._writer_lock = threading.Lock()
+        self._readers = queue.Queue()
+        for _ in range(readers):
+            reader = self._connect()
+            reader.execute("PRAGMA query_only = ON")
+            self._readers.put(reader)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.database, timeout=self.busy_timeout, check_same_thread=False)
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA temp_store = MEMORY")
+        connection.execute("PRAGMA cache_size = -65536")  # 64 MiB
+        connection.execute("PRAGMA mmap_size = 268435456")  # 256 MiB
+        return connection
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only connection, waiting for one to be free."""
+        connection = self._readers.get()
         try:
-            response = requests.get(url)
-            response.raise_for_status()  # Raise for 4xx/5xx errors
-            response_data = response.json()
-
-            # Check for API errors
-            if "Error Message" in response_data:
-                raise ValueError(f"API Error: {response_data['Error Message']}")
-            if "Note" in response_data:
-                logger.info("Rate limit reached. Waiting 15 seconds...")
-                time.sleep(15)
-                return self.get_daily(ticker, output_size)  # Retry
-            if "Time Series (Daily)" not in response_data:
-                raise ValueError(f"Invalid API call. Check ticker symbol '{ticker}'")
-
-            # Process data into DataFrame
-            stock_data = response_data["Time Series (Daily)"]
-            df = pd.DataFrame.from_dict(stock_data, orient="index")
-            # Validate numeric data
-            for col in ["1. open", "2. high", "3. low", "4. close", "5. volume"]:
-                if not pd.to_numeric(df[col], errors="coerce").notnull().all():
-                    raise ValueError(f"Non-numeric data found in column '{col}' for ticker '{ticker}'")
-            df = df.astype({
-                "1. open": "float64",
-                "2. high": "float64",
-                "3. low": "float64",
-                "4. close": "float64",
-                "5. volume": "int64"  # Use int64 to handle large volumes
-            })
-            df.columns = [c.split(". ")[1] if ". " in c else c for c in df.columns]
-            df.index = pd.to_datetime(df.index)
-            df.index.name = "date"
-            expected_columns = ["open", "high", "low", "close", "volume"]
-            df = df[expected_columns]
+            yield connection
+        finally:
+            self._readers.put(connection)
 
-            return df
+    @contextmanager
+    def writer(self):
+        """Hold the writer connection exclusively."""
+        with self._writer_lock:
+            yield self.writer_connection
 
-        except requests.exceptions.RequestException as e:
-            raise ValueError(f"Failed to fetch data for {ticker}: {e}")
+    def close(self) -> None:
+        """Close every connection of the pool."""
+        with self._writer_lock:
+            self.writer_connection.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
 
 class SQLRepository:
-    def __init__(self, connection: sqlite3.Connection):
-        """Initialize SQLRepository with a SQLite connection.
+    def __init__(self, connection: sqlite3.Connection = None, pool: ConnectionPool = None):
+        """Initialize SQLRepository with a SQLite connection or a connection pool.
 
         Args:
-            connection (sqlite3.Connection): SQLite database connection.
+            connection (sqlite3.Connection, optional): SQLite database connection used for
+                both reads and writes.
+            pool (ConnectionPool, optional): Pool to borrow connections from instead, so
+                reads from several threads run in parallel. Its writer connection is exposed
+                as self.connection.
+
+        Raises:
+            ValueError: If neither or both of connection and pool are given.
         """
-        self.connection = connection
+        if (connection is None) == (pool is None):
+            raise ValueError("Exactly one of connection and pool must be given")
+        self.pool = pool
+        self.connection = connection if pool is None else pool.writer_connection
+
+    @contextmanager
+    def _reading(self):
+        """Connection to read from: a pooled reader, or self.connection."""
+        if self.pool is None:
+            yield self.connection
+        else:
+            with self.pool.reader() as connection:
+                yield connection
+
+    @contextmanager
+    def _writing(self):
+        """Connection to write to: the pool's writer (held exclusively), or self.connection."""
+        if self.pool is None:
+            yield self.connection
+        else:
+            with self.pool.writer() as connection:
+                yield connection
 
+    @timed("repo.insert_table")
     def insert_table(self, table_name: str, records: pd.DataFrame, if_exists: str = "fail") -> dict:
         """Insert DataFrame into SQLite database as a table.
 
@@ -110,7 +459,8 @@ class SQLRepository:
             if_exists (str): How to behave if the table already exists. Options are:
                 - 'fail': Raise a ValueError
                 - 'replace': Drop the table before inserting new values
-                - 'append': Insert new values to the existing table
+                - 'append': Upsert new values into the existing table; a bar for a date
+                  that is already stored replaces it
                 Defaults to 'fail'.
 
         Returns:
@@ -139,9 +489,27 @@ class SQLRepository:
         table_name = table_name.replace(".", "_")
 
         try:
-            n_inserted = records.to_sql(
-                name=table_name, con=self.connection, if_exists=if_exists, index=True
-            )
+            with self._writing() as connection:
+                exists = connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+                ).fetchone() is not None
+                if if_exists == "append" and exists:
+                    self._ensure_date_key(connection, table_name)
+                    rows = zip(
+                        records.index.strftime("%Y-%m-%d %H:%M:%S"),
+                        *(records[col].tolist() for col in expected_columns)
+                    )
+                    with connection:
+                        n_inserted = connection.executemany(
+                            f"INSERT OR REPLACE INTO '{table_name}' (date, open, high, low, close, volume) "
+                            f"VALUES (?, ?, ?, ?, ?, ?)",
+                            rows
+                        ).rowcount
+                else:
+                    n_inserted = records.to_sql(
+                        name=table_name, con=connection, if_exists=if_exists, index=True
+                    )
+                    self._ensure_date_key(connection, table_name)
             return {
                 "transaction_successful": True,
                 "records_inserted": n_inserted
@@ -153,20 +521,40 @@ class SQLRepository:
                 "error": str(e)
             }
 
-    def read_table(self, table_name: str, limit: int = None) -> pd.DataFrame:
+    @staticmethod
+    def _ensure_date_key(connection: sqlite3.Connection, table_name: str) -> None:
+        """Add a unique index on date to a per-ticker table, first dropping duplicate bars
+        (keeping the last written) from tables created before the index existed."""
+        index_name = f"ux_{table_name}_date"  # to_sql already creates a non-unique ix_<table>_date
+        if connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name,)
+        ).fetchone() is not None:
+            return
+        with connection:
+            connection.execute(
+                f"DELETE FROM '{table_name}' WHERE rowid NOT IN "
+                f"(SELECT MAX(rowid) FROM '{table_name}' GROUP BY date)"
+            )
+            connection.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS '{index_name}' ON '{table_name}' (date)")
+
+    @timed("repo.read_table")
+    def read_table(self, table_name: str, limit: int = None, columns: list = None) -> pd.DataFrame:
         """Read table from SQLite database.
 
         Args:
             table_name (str): Name of the table in the SQLite database.
             limit (int, optional): Number of most recent records to retrieve (ordered by date descending).
                 If None, all records are retrieved. Defaults to None.
+            columns (list, optional): Subset of ['open', 'high', 'low', 'close', 'volume'] to
+                read. Defaults to all of them.
 
         Returns:
             pd.DataFrame: DataFrame with DatetimeIndex 'date' and columns
-                ['open', 'high', 'low', 'close', 'volume']. All columns are numeric.
+                ['open', 'high', 'low', 'close', 'volume'] (or the requested subset). All
+                columns are numeric.
 
         Raises:
-            ValueError: If table_name is invalid, limit is invalid, or table read fails.
+            ValueError: If table_name is invalid, limit or columns is invalid, or table read fails.
         """
         # Validate inputs
         if not isinstance(table_name, str) or not table_name:
@@ -175,32 +563,708 @@ class SQLRepository:
             raise ValueError("Table name must contain only alphanumeric characters and underscores")
         if limit is not None and (not isinstance(limit, int) or limit <= 0):
             raise ValueError("Limit must be a positive integer or None")
+        expected_columns = ["open", "high", "low", "close", "volume"]
+        columns = _validate_columns(columns)
 
         # Normalize table name
         table_name = table_name.replace(".", "_")
 
         # Create SQL query
+        select = "*" if columns == expected_columns else ", ".join(["date"] + columns)
         if limit:
-            sql = f"SELECT * FROM '{table_name}' ORDER BY date DESC LIMIT {limit}"
+            sql = f"SELECT {select} FROM '{table_name}' ORDER BY date DESC LIMIT {limit}"
         else:
-            sql = f"SELECT * FROM '{table_name}' ORDER BY date DESC"
+            sql = f"SELECT {select} FROM '{table_name}' ORDER BY date DESC"
 
         # Retrieve data
         try:
-            df = pd.read_sql(
-                sql=sql, con=self.connection, parse_dates=['date'], index_col="date"
-            )
+            with self._reading() as connection:
+                df = pd.read_sql(
+                    sql=sql, con=connection, parse_dates=['date'], index_col="date"
+                )
             # Validate columns
-            expected_columns = ["open", "high", "low", "close", "volume"]
-            if not all(col in df.columns for col in expected_columns):
-                raise ValueError(f"Table '{table_name}' missing required columns: {expected_columns}")
-            df = df[expected_columns].astype({
-                "open": "float64",
-                "high": "float64",
-                "low": "float64",
-                "close": "float64",
-                "volume": "int64"
-            })
+            if not all(col in df.columns for col in columns):
+                raise ValueError(f"Table '{table_name}' missing required columns: {columns}")
+            df = df[columns].astype({col: _COLUMN_DTYPES[col] for col in columns})
             return df
         except Exception as e:
-            raise ValueError(f"Failed to read table '{table_name}': {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Failed to read table '{table_name}': {str(e)}")
+
+    def latest_date(self, table_name: str) -> pd.Timestamp:
+        """Return the most recent date stored in a table.
+
+        Args:
+            table_name (str): Name of the table in the SQLite database.
+
+        Returns:
+            pd.Timestamp: Latest value of the 'date' column, or None if the table
+                does not exist or is empty.
+
+        Raises:
+            ValueError: If table_name is invalid or the query fails.
+        """
+        # Validate inputs
+        if not isinstance(table_name, str) or not table_name:
+            raise ValueError("Table name must be a non-empty string")
+        table_name = table_name.replace(".", "_")
+        if not re.match(r"^[a-zA-Z0-9_]+$", table_name):
+            raise ValueError("Table name must contain only alphanumeric characters and underscores")
+
+        try:
+            with self._reading() as connection:
+                exists = connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+                ).fetchone()
+                if exists is None:
+                    return None
+                (latest,) = connection.execute(f"SELECT MAX(date) FROM '{table_name}'").fetchone()
+            return pd.Timestamp(latest) if latest is not None else None
+        except Exception as e:
+            raise ValueError(f"Failed to read latest date from '{table_name}': {str(e)}")
+
+    @timed("repo.insert_forecast")
+    def insert_forecast(self, ticker: str, forecast: dict, model_path: str) -> dict:
+        """Store a volatility forecast in the 'forecasts' table, replacing any previous one for ticker.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            forecast (dict): Forecast as returned by GarchModel.predict_volatility, keys are
+                ISO 8601 dates in forecast order, values are volatility.
+            model_path (str): File of the model that produced the forecast.
+
+        Returns:
+            dict: Dictionary with keys:
+                - 'transaction_successful': bool
+                - 'records_inserted': int
+                - 'error': str (only if transaction fails)
+
+        Raises:
+            ValueError: If ticker is invalid or forecast is not a dictionary.
+        """
+        # Validate inputs
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("Ticker must be a non-empty string")
+        if not isinstance(forecast, dict):
+            raise ValueError("Forecast must be a dictionary")
+
+        rows = [
+            (ticker, step, date, volatility, model_path)
+            for step, (date, volatility) in enumerate(forecast.items(), start=1)
+        ]
+        try:
+            with self._writing() as connection, connection:
+                connection.execute(
+                    """CREATE TABLE IF NOT EXISTS forecasts (
+                        ticker TEXT NOT NULL,
+                        step INTEGER NOT NULL,
+                        date TEXT NOT NULL,
+                        volatility REAL NOT NULL,
+                        model_path TEXT NOT NULL,
+                        PRIMARY KEY (ticker, step)
+                    ) WITHOUT ROWID"""
+                )
+                connection.execute("DELETE FROM forecasts WHERE ticker = ?", (ticker,))
+                connection.executemany("INSERT INTO forecasts VALUES (?, ?, ?, ?, ?)", rows)
+            return {
+                "transaction_successful": True,
+                "records_inserted": len(rows)
+            }
+        except Exception as e:
+            return {
+                "transaction_successful": False,
+                "records_inserted": 0,
+                "error": str(e)
+            }
+
+    @timed("repo.read_forecast")
+    def read_forecast(self, ticker: str, horizon: int) -> dict:
+        """Read the first `horizon` days of the stored forecast for ticker.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            horizon (int): Number of forecast days to retrieve.
+
+        Returns:
+            dict: Keys are ISO 8601 dates, values are volatility. None if no forecast of the
+                latest registered model is stored for ticker, or it covers fewer than
+                `horizon` days.
+
+        Raises:
+            ValueError: If ticker or horizon is invalid.
+        """
+        # Validate inputs
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("Ticker must be a non-empty string")
+        if not isinstance(horizon, int) or horizon <= 0:
+            raise ValueError("Horizon must be a positive integer")
+
+        try:
+            with self._reading() as connection:
+                rows = connection.execute(
+                    """SELECT date, volatility FROM forecasts
+                    WHERE ticker = ? AND step <= ? AND model_path = (
+                        SELECT path FROM models WHERE ticker = ? ORDER BY timestamp DESC LIMIT 1
+                    )
+                    ORDER BY step""",
+                    (ticker, horizon, ticker)
+                ).fetchall()
+        except sqlite3.OperationalError:
+            # No forecast or model has been stored yet
+            return None
+        if len(rows) < horizon:
+            return None
+        return dict(rows)
+
+    def delete_forecast(self, ticker: str) -> None:
+        """Remove the stored forecast for ticker, if any.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+
+        Raises:
+            ValueError: If ticker is invalid.
+        """
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("Ticker must be a non-empty string")
+
+        try:
+            with self._writing() as connection, connection:
+                connection.execute("DELETE FROM forecasts WHERE ticker = ?", (ticker,))
+        except sqlite3.OperationalError:
+            # No forecast has been stored yet
+            pass
+
+    def register_model(self, ticker: str, path: str, timestamp: str, p: int, q: int,
+                       aic: float, bic: float, n_obs: int) -> dict:
+        """Record a saved model in the 'models' registry table.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            path (str): File where the model was saved.
+            timestamp (str): ISO 8601 time the model was saved.
+            p (int): Lag order of the symmetric innovation.
+            q (int): Lag order of lagged volatility.
+            aic (float): Akaike Information Criterion of the model.
+            bic (float): Bayesian Information Criterion of the model.
+            n_obs (int): Number of observations the model was trained on.
+
+        Returns:
+            dict: Dictionary with keys:
+                - 'transaction_successful': bool
+                - 'records_inserted': int
+                - 'error': str (only if transaction fails)
+
+        Raises:
+            ValueError: If ticker or path is invalid.
+        """
+        # Validate inputs
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("Ticker must be a non-empty string")
+        if not isinstance(path, str) or not path:
+            raise ValueError("Path must be a non-empty string")
+
+        try:
+            with self._writing() as connection, connection:
+                connection.execute(
+                    """CREATE TABLE IF NOT EXISTS models (
+                        ticker TEXT NOT NULL,
+                        path TEXT NOT NULL PRIMARY KEY,
+                        timestamp TEXT NOT NULL,
+                        p INTEGER NOT NULL,
+                        q INTEGER NOT NULL,
+                        aic REAL,
+                        bic REAL,
+                        n_obs INTEGER
+                    )"""
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_models_ticker_timestamp ON models (ticker, timestamp)"
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (ticker, path, timestamp, p, q, aic, bic, n_obs)
+                )
+            return {
+                "transaction_successful": True,
+                "records_inserted": 1
+            }
+        except Exception as e:
+            return {
+                "transaction_successful": False,
+                "records_inserted": 0,
+                "error": str(e)
+            }
+
+    def latest_model_path(self, ticker: str) -> str:
+        """Return the file of the most recently registered model for ticker.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+
+        Returns:
+            str: Path of the latest model, or None if no model is registered for ticker.
+
+        Raises:
+            ValueError: If ticker is invalid.
+        """
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("Ticker must be a non-empty string")
+
+        try:
+            with self._reading() as connection:
+                row = connection.execute(
+                    "SELECT path FROM models WHERE ticker = ? ORDER BY timestamp DESC LIMIT 1", (ticker,)
+                ).fetchone()
+        except sqlite3.OperationalError:
+            # Registry has not been created yet
+            return None
+        return row[0] if row is not None else None
+
+    def prune_models(self, ticker: str, keep: int) -> list:
+        """Remove all but the `keep` most recent registry entries for ticker.
+
+        Only registry rows are deleted; removing the model files is up to the caller.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            keep (int): Number of most recent models to keep.
+
+        Returns:
+            list: Paths of the models removed from the registry, oldest first.
+
+        Raises:
+            ValueError: If ticker or keep is invalid.
+        """
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("Ticker must be a non-empty string")
+        if not isinstance(keep, int) or keep <= 0:
+            raise ValueError("Keep must be a positive integer")
+
+        try:
+            with self._writing() as connection, connection:
+                rows = connection.execute(
+                    "SELECT path FROM models WHERE ticker = ? ORDER BY timestamp DESC LIMIT -1 OFFSET ?",
+                    (ticker, keep)
+                ).fetchall()
+                paths = [path for (path,) in reversed(rows)]
+                connection.executemany("DELETE FROM models WHERE path = ?", rows)
+        except sqlite3.OperationalError:
+            return []
+        return paths
+
+class NormalizedSQLRepository(SQLRepository):
+    def __init__(self, connection: sqlite3.Connection = None, pool: ConnectionPool = None):
+        """Initialize a repository that keeps every ticker's bars in one 'prices' table.
+
+        The table has a (ticker, date) primary key, so reading the last N bars of a ticker
+        is an index seek and cross-ticker queries are plain SQL. WAL journaling and the
+        other pragmas below are applied to the connection. Forecasts and the model
+        registry are stored exactly as in SQLRepository.
+
+        Args:
+            connection (sqlite3.Connection, optional): SQLite database connection.
+            pool (ConnectionPool, optional): Pool to borrow connections from instead.
+        """
+        super().__init__(connection=connection, pool=pool)
+        with self._writing() as connection:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA temp_store = MEMORY")
+            connection.execute("PRAGMA cache_size = -65536")  # 64 MiB
+            connection.execute("PRAGMA mmap_size = 268435456")  # 256 MiB
+        with self._writing() as connection, connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS prices (
+                    ticker TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    volume INTEGER NOT NULL,
+                    PRIMARY KEY (ticker, date)
+                ) WITHOUT ROWID"""
+            )
+
+    @timed("repo.insert_table")
+    def insert_table(self, table_name: str, records: pd.DataFrame, if_exists: str = "fail") -> dict:
+        """Insert DataFrame rows into the 'prices' table under ticker table_name.
+
+        Args:
+            table_name (str): Ticker symbol the rows belong to.
+            records (pd.DataFrame): DataFrame containing stock data, indexed by date.
+            if_exists (str): How to behave if the ticker already has rows. Options are:
+                - 'fail': Insert nothing and report an error
+                - 'replace': Delete the ticker's rows before inserting new values
+                - 'append': Insert new values, overwriting rows with the same date
+                Defaults to 'fail'.
+
+        Returns:
+            dict: Dictionary with keys:
+                - 'transaction_successful': bool
+                - 'records_inserted': int
+                - 'error': str (only if transaction fails)
+
+        Raises:
+            ValueError: If table_name is invalid, records is not a DataFrame, or if_exists is invalid.
+        """
+        # Validate inputs
+        if not isinstance(table_name, str) or not table_name:
+            raise ValueError("Table name must be a non-empty string")
+        ticker = table_name.replace(".", "_")
+        if not re.match(r"^[a-zA-Z0-9_]+$", ticker):
+            raise ValueError("Table name must contain only alphanumeric characters and underscores")
+        if not isinstance(records, pd.DataFrame):
+            raise ValueError("Records must be a pandas DataFrame")
+        if if_exists not in ["fail", "replace", "append"]:
+            raise ValueError("if_exists must be 'fail', 'replace', or 'append'")
+        expected_columns = ["open", "high", "low", "close", "volume"]
+        if not all(col in records.columns for col in expected_columns):
+            raise ValueError(f"Records missing required columns: {expected_columns}")
+
+        dates = pd.DatetimeIndex(records.index).strftime("%Y-%m-%d %H:%M:%S")
+        rows = zip(
+            [ticker] * len(records),
+            dates,
+            *(records[col].to_numpy(dtype="float64").tolist() for col in expected_columns[:4]),
+            records["volume"].to_numpy(dtype="int64").tolist()
+        )
+        try:
+            with self._writing() as connection, connection:
+                if if_exists == "fail":
+                    exists = connection.execute(
+                        "SELECT 1 FROM prices WHERE ticker = ? LIMIT 1", (ticker,)
+                    ).fetchone()
+                    if exists is not None:
+                        raise ValueError(f"Prices for '{ticker}' already exist.")
+                elif if_exists == "replace":
+                    connection.execute("DELETE FROM prices WHERE ticker = ?", (ticker,))
+                connection.executemany(
+                    "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+            return {
+                "transaction_successful": True,
+                "records_inserted": len(records)
+            }
+        except Exception as e:
+            return {
+                "transaction_successful": False,
+                "records_inserted": 0,
+                "error": str(e)
+            }
+
+    @timed("repo.read_table")
+    def read_table(self, table_name: str, limit: int = None, columns: list = None) -> pd.DataFrame:
+        """Read the most recent bars of ticker table_name from the 'prices' table.
+
+        Args:
+            table_name (str): Ticker symbol to read.
+            limit (int, optional): Number of most recent records to retrieve (ordered by date descending).
+                If None, all records are retrieved. Defaults to None.
+            columns (list, optional): Subset of ['open', 'high', 'low', 'close', 'volume'] to
+                read. Defaults to all of them.
+
+        Returns:
+            pd.DataFrame: DataFrame with DatetimeIndex 'date' and columns
+                ['open', 'high', 'low', 'close', 'volume'] (or the requested subset). All
+                columns are numeric.
+
+        Raises:
+            ValueError: If table_name is invalid, limit or columns is invalid, or no rows exist
+                for the ticker.
+        """
+        # Validate inputs
+        if not isinstance(table_name, str) or not table_name:
+            raise ValueError("Table name must be a non-empty string")
+        ticker = table_name.replace(".", "_")
+        if not re.match(r"^[a-zA-Z0-9_]+$", ticker):
+            raise ValueError("Table name must contain only alphanumeric characters and underscores")
+        if limit is not None and (not isinstance(limit, int) or limit <= 0):
+            raise ValueError("Limit must be a positive integer or None")
+        columns = _validate_columns(columns)
+
+        sql = f"SELECT {', '.join(['date'] + columns)} FROM prices WHERE ticker = ? ORDER BY date DESC"
+        with self._reading() as connection:
+            rows = connection.execute(
+                f"{sql} LIMIT ?" if limit else sql, (ticker, limit) if limit else (ticker,)
+            ).fetchall()
+        df = self._to_frame(rows, columns)
+        if df.empty:
+            raise ValueError(f"Failed to read table '{ticker}': no prices stored for ticker")
+        return df
+
+    def read_range(self, ticker: str, start: str = None, end: str = None) -> pd.DataFrame:
+        """Read a ticker's bars between two dates (inclusive), in ascending date order.
+
+        Args:
+            ticker (str): Ticker symbol to read.
+            start (str, optional): First date, e.g. '2024-01-31'. Defaults to the first stored bar.
+            end (str, optional): Last date. Defaults to the last stored bar.
+
+        Returns:
+            pd.DataFrame: DataFrame with DatetimeIndex 'date' and columns
+                ['open', 'high', 'low', 'close', 'volume']. Empty if no bars are in range.
+
+        Raises:
+            ValueError: If ticker is invalid.
+        """
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("Ticker must be a non-empty string")
+        ticker = ticker.replace(".", "_")
+        start = pd.Timestamp(start).strftime("%Y-%m-%d %H:%M:%S") if start is not None else ""
+        end = pd.Timestamp(end).strftime("%Y-%m-%d %H:%M:%S") if end is not None else "9999"
+        with self._reading() as connection:
+            rows = connection.execute(
+                """SELECT date, open, high, low, close, volume FROM prices
+                WHERE ticker = ? AND date >= ? AND date <= ? ORDER BY date""",
+                (ticker, start, end)
+            ).fetchall()
+        return self._to_frame(rows, list(_COLUMN_DTYPES))
+
+    def latest_date(self, table_name: str) -> pd.Timestamp:
+        """Return the most recent date stored for ticker table_name, or None if it has no rows."""
+        if not isinstance(table_name, str) or not table_name:
+            raise ValueError("Table name must be a non-empty string")
+        with self._reading() as connection:
+            (latest,) = connection.execute(
+                "SELECT MAX(date) FROM prices WHERE ticker = ?", (table_name.replace(".", "_"),)
+            ).fetchone()
+        return pd.Timestamp(latest) if latest is not None else None
+
+    def tickers(self) -> list:
+        """Return the tickers that have prices stored, in alphabetical order."""
+        with self._reading() as connection:
+            rows = connection.execute("SELECT DISTINCT ticker FROM prices ORDER BY ticker").fetchall()
+        return [ticker for (ticker,) in rows]
+
+    @staticmethod
+    def _to_frame(rows: list, columns: list) -> pd.DataFrame:
+        """Build a price DataFrame from (date, *columns) rows."""
+        if not rows:
+            empty = pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name="date"))
+            return empty.astype({col: _COLUMN_DTYPES[col] for col in columns})
+        dates, *values = zip(*rows)
+        return pd.DataFrame(
+            {col: np.array(value, dtype=_COLUMN_DTYPES[col]) for col, value in zip(columns, values)},
+            index=pd.DatetimeIndex(np.array(dates, dtype="datetime64[ns]"), name="date")
+        )
+
+class ArrowRepository(SQLRepository):
+    def __init__(self, connection: sqlite3.Connection = None, pool: ConnectionPool = None,
+                 directory: str = settings.price_directory):
+        """Initialize a repository that keeps each ticker's bars in a columnar Arrow file.
+
+        Bars are stored in date order as uncompressed Arrow IPC files, which are read
+        through a memory map, so a read only touches the requested columns and rows.
+        Forecasts and the model registry are still stored in SQLite as in SQLRepository.
+        Requires the optional 'pyarrow' package.
+
+        Args:
+            connection (sqlite3.Connection, optional): SQLite database connection.
+            pool (ConnectionPool, optional): Pool to borrow connections from instead.
+            directory (str): Directory of the Arrow files. Defaults to settings.price_directory.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            raise ImportError("The 'arrow' storage layout requires pyarrow: pip install pyarrow")
+        super().__init__(connection=connection, pool=pool)
+        self._pa = pyarrow
+        self.directory = directory
+        self._write_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, table_name: str) -> str:
+        """Validate ticker table_name and return the path of its Arrow file."""
+        if not isinstance(table_name, str) or not table_name:
+            raise ValueError("Table name must be a non-empty string")
+        ticker = table_name.replace(".", "_")
+        if not re.match(r"^[a-zA-Z0-9_]+$", ticker):
+            raise ValueError("Table name must contain only alphanumeric characters and underscores")
+        return os.path.join(self.directory, f"{ticker}.arrow")
+
+    def _open(self, path: str):
+        """Memory-map the Arrow file at path as a pyarrow Table (no data is copied)."""
+        with self._pa.memory_map(path, "r") as source:
+            return self._pa.ipc.open_file(source).read_all()
+
+    @timed("repo.insert_table")
+    def insert_table(self, table_name: str, records: pd.DataFrame, if_exists: str = "fail") -> dict:
+        """Write DataFrame rows to the Arrow file of ticker table_name.
+
+        Args:
+            table_name (str): Ticker symbol the rows belong to.
+            records (pd.DataFrame): DataFrame containing stock data, indexed by date.
+            if_exists (str): How to behave if the ticker already has a file. Options are:
+                - 'fail': Write nothing and report an error
+                - 'replace': Overwrite the file
+                - 'append': Merge the new rows in, overwriting rows with the same date
+                Defaults to 'fail'.
+
+        Returns:
+            dict: Dictionary with keys:
+                - 'transaction_successful': bool
+                - 'records_inserted': int
+                - 'error': str (only if transaction fails)
+
+        Raises:
+            ValueError: If table_name is invalid, records is not a DataFrame, or if_exists is invalid.
+        """
+        # Validate inputs
+        path = self._path(table_name)
+        if not isinstance(records, pd.DataFrame):
+            raise ValueError("Records must be a pandas DataFrame")
+        if if_exists not in ["fail", "replace", "append"]:
+            raise ValueError("if_exists must be 'fail', 'replace', or 'append'")
+        expected_columns = list(_COLUMN_DTYPES)
+        if not all(col in records.columns for col in expected_columns):
+            raise ValueError(f"Records missing required columns: {expected_columns}")
+
+        df = records[expected_columns].astype(_COLUMN_DTYPES)
+        df.index = pd.DatetimeIndex(df.index, name="date").astype("datetime64[ns]")
+        try:
+            with self._write_lock:
+                if os.path.exists(path):
+                    if if_exists == "fail":
+                        raise ValueError(f"Prices for '{table_name}' already exist.")
+                    if if_exists == "append":
+                        existing = self._open(path).to_pandas().set_index("date")
+                        df = pd.concat([existing[~existing.index.isin(df.index)], df])
+                df = df.sort_index()
+                table = self._pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+                # Write to a temporary file and swap it in, so readers never see a partial file
+                tmp_path = f"{path}.tmp"
+                with self._pa.OSFile(tmp_path, "wb") as sink:
+                    with self._pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                os.replace(tmp_path, path)
+            return {
+                "transaction_successful": True,
+                "records_inserted": len(records)
+            }
+        except Exception as e:
+            return {
+                "transaction_successful": False,
+                "records_inserted": 0,
+                "error": str(e)
+            }
+
+    @timed("repo.read_table")
+    def read_table(self, table_name: str, limit: int = None, columns: list = None) -> pd.DataFrame:
+        """Read the most recent bars of ticker table_name from its Arrow file.
+
+        Only the requested columns of the last `limit` rows are converted to pandas.
+
+        Args:
+            table_name (str): Ticker symbol to read.
+            limit (int, optional): Number of most recent records to retrieve (ordered by date descending).
+                If None, all records are retrieved. Defaults to None.
+            columns (list, optional): Subset of ['open', 'high', 'low', 'close', 'volume'] to
+                read. Defaults to all of them.
+
+        Returns:
+            pd.DataFrame: DataFrame with DatetimeIndex 'date' and columns
+                ['open', 'high', 'low', 'close', 'volume'] (or the requested subset). All
+                columns are numeric.
+
+        Raises:
+            ValueError: If table_name is invalid, limit or columns is invalid, or the file read fails.
+        """
+        path = self._path(table_name)
+        if limit is not None and (not isinstance(limit, int) or limit <= 0):
+            raise ValueError("Limit must be a positive integer or None")
+        columns = _validate_columns(columns)
+
+        try:
+            table = self._open(path).select(["date"] + columns)
+            if limit:
+                table = table.slice(max(table.num_rows - limit, 0))
+            df = table.to_pandas().set_index("date")
+        except Exception as e:
+            raise ValueError(f"Failed to read table '{table_name}': {str(e)}")
+        return df.iloc[::-1]
+
+    def latest_date(self, table_name: str) -> pd.Timestamp:
+        """Return the most recent date stored for ticker table_name, or None if it has no file."""
+        path = self._path(table_name)
+        if not os.path.exists(path):
+            return None
+        dates = self._open(path).column("date")
+        return pd.Timestamp(dates[len(dates) - 1].as_py()) if len(dates) else None
+
+def build_repository(connection: sqlite3.Connection = None, layout: str = None,
+                     pool: ConnectionPool = None) -> SQLRepository:
+    """Create the repository for the configured storage layout.
+
+    Args:
+        connection (sqlite3.Connection, optional): SQLite database connection.
+        layout (str, optional): 'tables' (one table per ticker), 'prices' (one normalized
+            table) or 'arrow' (one Arrow file per ticker). Defaults to settings.storage_layout.
+        pool (ConnectionPool, optional): Pool to use instead of a single connection.
+
+    Returns:
+        SQLRepository: Repository for the layout.
+
+    Raises:
+        ValueError: If layout is unknown.
+    """
+    layout = layout or settings.storage_layout
+    if layout == "tables":
+        return SQLRepository(connection=connection, pool=pool)
+    if layout == "prices":
+        return NormalizedSQLRepository(connection=connection, pool=pool)
+    if layout == "arrow":
+        return ArrowRepository(connection=connection, pool=pool)
+    raise ValueError("layout must be 'tables', 'prices' or 'arrow'")
+
+def migrate_to_prices(connection: sqlite3.Connection, tickers: list = None, drop: bool = False) -> dict:
+    """Copy per-ticker tables into the normalized 'prices' table of the same database.
+
+    Args:
+        connection (sqlite3.Connection): SQLite database connection.
+        tickers (list, optional): Tables to migrate. Defaults to every table with the
+            price columns.
+        drop (bool): Whether to drop each per-ticker table once it has been copied. Defaults to False.
+
+    Returns:
+        dict: Maps each ticker to the result of NormalizedSQLRepository.insert_table. Tickers
+            whose table cannot be read or dropped map to a result dict with
+            'transaction_successful' False and an 'error' message.
+    """
+    source = SQLRepository(connection=connection)
+    target = NormalizedSQLRepository(connection=connection)
+    if tickers is None:
+        tables = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT IN ('prices', 'forecasts', 'models')"
+        ).fetchall()
+        expected_columns = {"date", "open", "high", "low", "close", "volume"}
+        tickers = [
+            name for (name,) in tables
+            if expected_columns <= {col[1] for col in connection.execute(f"PRAGMA table_info('{name}')")}
+        ]
+
+    results = {}
+    for ticker in tickers:
+        try:
+            records = source.read_table(table_name=ticker)
+        except ValueError as e:
+            results[ticker] = {"transaction_successful": False, "records_inserted": 0, "error": str(e)}
+            logger.info(f"Could not migrate '{ticker}': {e}")
+            continue
+        results[ticker] = target.insert_table(table_name=ticker, records=records, if_exists="replace")
+        if drop and results[ticker]["transaction_successful"]:
+            table_name = ticker.replace(".", "_")
+            try:
+                with connection:
+                    connection.execute(f"DROP TABLE '{table_name}'")
+            except sqlite3.Error as e:
+                results[ticker]["transaction_successful"] = False
+                results[ticker]["error"] = f"Copied but could not drop '{table_name}': {e}"
+                logger.info(f"Could not drop '{table_name}': {e}")
+                continue
+        logger.info(f"Migrated {results[ticker]['records_inserted']} rows of '{ticker}'")
+    return results
@@ -0,0 +1,218 @@
+"""Lightweight timing instrumentation with Prometheus text exposition.
+Stages are timed with `timed`, which feeds the stage histogram and, inside `profile()`,
+the per-request breakdown.
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        """Initialize a metric and add it to the module registry.
+
+        Args:
+            name (str): Metric name, e.g. 'garch_stage_seconds'.
+            documentation (str): Help text shown by /metrics.
+            labelnames (tuple): Names of the labels every sample carries. Defaults to ().
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple, extra: dict = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def samples(self) -> list:
+        """Return the (suffix, label string, value) samples of the metric."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Return the metric in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{suffix}{labels} {value:g}" for suffix, labels, value in self.samples()]
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), callback=None):
+        """Initialize a monotonically increasing counter.
+
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labelnames (tuple): Label names. Defaults to ().
+            callback (callable, optional): Function returning {label values tuple: value},
+                read at scrape time instead of values recorded with inc().
+        """
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._callback = callback
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Add amount to the counter for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Return the current value for the given label values."""
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list:
+        values = self._callback() if self._callback is not None else self._values
+        with self._lock:
+            return [("_total", self._labels(key), value) for key, value in sorted(values.items())]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        """Initialize a histogram with cumulative buckets.
+
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labelnames (tuple): Label names. Defaults to ().
+            buckets (tuple): Upper bounds of the buckets, ascending. Defaults to DEFAULT_BUCKETS.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., count, sum]
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        """Return the number of observations for the given label values."""
+        series = self._series.get(self._key(labels))
+        return series[-2] if series else 0
+
+    def samples(self) -> list:
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    samples.append(("_bucket", self._labels(key, {"le": f"{bound:g}"}), count))
+                samples.append(("_bucket", self._labels(key, {"le": "+Inf"}), series[-2]))
+                samples.append(("_count", self._labels(key), series[-2]))
+                samples.append(("_sum", self._labels(key), series[-1]))
+        return samples
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram(
+    "garch_stage_seconds", "Time spent in each stage of the fit and predict pipelines.", ("stage",)
+)
+API_CALLS = Counter(
+    "garch_alpha_vantage_calls", "Alpha Vantage HTTP requests by outcome.", ("outcome",)
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "garch_rate_limit_wait_seconds", "Time spent waiting for the Alpha Vantage rate limiter.",
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+class Profile:
+    """Per-request breakdown of stage durations."""
+
+    def __init__(self):
+        self._stages = {}  # stage -> [count, seconds]
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add one timed call of stage."""
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def stages(self) -> dict:
+        """Return {stage: {'count': int, 'seconds': float}} in the order stages first ran."""
+        with self._lock:
+            return {stage: {"count": count, "seconds": seconds} for stage, (count, seconds) in self._stages.items()}
+
+    def server_timing(self) -> str:
+        """Return the breakdown as a Server-Timing header value (durations in milliseconds)."""
+        return ", ".join(
+            f'{stage};dur={entry["seconds"] * 1000:.3f};desc="x{entry["count"]}"'
+            for stage, entry in self.stages().items()
+        )
+
+_profile = contextvars.ContextVar("profile", default=None)
+
+@contextmanager
+def profile():
+    """Collect the stages timed in the current context (and contexts copied from it).
+
+    Yields:
+        Profile: The breakdown, filled in as stages complete.
+    """
+    current = Profile()
+    token = _profile.set(current)
+    try:
+        yield current
+    finally:
+        _profile.reset(token)
+
+def record(stage: str, seconds: float) -> None:
+    """Record a duration measured elsewhere for stage."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    current = _profile.get()
+    if current is not None:
+        current.add(stage, seconds)
+
+class timed:
+    """Time a block or function as a pipeline stage.
+
+    Usable as a context manager (`with timed("model.fit"):`) or as a decorator.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.stage, time.perf_counter() - self._start)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+def render() -> str:
+    """Return every registered metric in Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
@@ -0,0 +1,27 @@
+"""Migrate per-ticker price tables to the normalized 'prices' table.
+
+Usage:
+    python migrate.py [TICKER ...] [--drop]
+
+Set storage_layout=prices afterwards so the API reads from the new table.
+"""
+import argparse
+import sqlite3
+from config import settings
+from data import migrate_to_prices
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy per-ticker tables into the 'prices' table.")
+    parser.add_argument("tickers", nargs="*", help="Tables to migrate (default: all price tables)")
+    parser.add_argument("--drop", action="store_true", help="Drop each table after it is copied")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(settings.db_name)
+    try:
+        results = migrate_to_prices(connection, tickers=args.tickers or None, drop=args.drop)
+    finally:
+        connection.close()
+    failed = {ticker: result["error"] for ticker, result in results.items() if not result["transaction_successful"]}
+    print(f"Migrated {len(results) - len(failed)} of {len(results)} tables.")
+    for ticker, error in failed.items():
+        print(f"  {ticker}: {error}")
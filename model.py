@@ -1,11 +1,17 @@
 # model.py
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from glob import glob
 import joblib
+import numpy as np
 import pandas as pd
 from arch import arch_model
 from config import settings
-from data import AlphaVantage, SQLRepository
+from data import AlphaVantage, SQLRepository, build_repository
+from metrics import timed
 
 class GarchModel:
     """Class for training GARCH model and generating volatility predictions.
@@ -22,8 +28,8 @@ class GarchModel:
         Path to directory where trained models are stored.
     data : pd.Series
         Equity returns for training (set by wrangle_data).
-    model : arch.univariate.base.ARCHModelResult
-        Trained GARCH model (set by fit).
+    model : arch.univariate.base.ARCHModelResult or GarchState
+        Trained GARCH model (set by fit), or its compact state (set by load).
     aic : float
         Akaike Information Criterion of the trained model (set by fit).
     bic : float
@@ -31,16 +37,26 @@ class GarchModel:
     
     Methods
     --------
+    sync_data
+        Download new bars from AlphaVantage and store them in the database.
     wrangle_data
         Generate equity returns from database or API.
     fit
         Fit GARCH model to training data.
+    refit
+        Update the latest saved model with new data, warm-started or rolled forward.
+    select_order
+        Choose p and q by information criterion and fit the best model.
     predict_volatility
         Generate volatility forecast from trained model.
+    backtest
+        Walk-forward validation of one-day-ahead volatility forecasts.
     dump
-        Save trained model to file.
+        Save trained model to file and record it in the model registry.
     load
         Load most recent trained model from file.
+    prune
+        Delete superseded model files beyond the retention limit.
     """
     def __init__(self, ticker: str, repo: SQLRepository, use_new_data: bool):
         self.ticker = ticker
@@ -49,13 +65,54 @@ class GarchModel:
         self.model_directory = settings.model_directory
         os.makedirs(self.model_directory, exist_ok=True)  # Ensure directory exists
 
-    def wrangle_data(self, n_observations: int) -> pd.Series:
+    @timed("model.sync_data")
+    def sync_data(self, incremental: bool = settings.incremental_sync) -> dict:
+        """Download daily bars for self.ticker from AlphaVantage and store them in self.repo.
+
+        In incremental mode only bars newer than the latest stored date are upserted,
+        and the 'compact' (last 100 bars) payload is requested when that is enough to
+        close the gap. Otherwise the full history is downloaded and the table replaced.
+
+        Parameters
+        -----------
+        incremental : bool
+            Whether to append only missing bars (default: settings.incremental_sync).
+
+        Returns
+        --------
+        dict
+            Result of SQLRepository.insert_table.
+        """
+        api = AlphaVantage()
+        latest = self.repo.latest_date(self.ticker) if incremental else None
+        if latest is None:
+            new_data = api.get_daily(ticker=self.ticker, output_size="full")
+            return self.repo.insert_table(
+                table_name=self.ticker, records=new_data, if_exists="replace"
+            )
+
+        # Business days elapsed since the latest stored bar
+        gap = len(pd.bdate_range(start=latest, end=pd.Timestamp.now().normalize())) - 1
+        output_size = "compact" if gap < 100 else "full"
+        new_data = api.get_daily(ticker=self.ticker, output_size=output_size)
+        new_data = new_data[new_data.index > latest]
+        if new_data.empty:
+            return {"transaction_successful": True, "records_inserted": 0}
+        return self.repo.insert_table(
+            table_name=self.ticker, records=new_data, if_exists="append"
+        )
+
+    @timed("model.wrangle")
+    def wrangle_data(self, n_observations: int, cache: "ReturnsCache" = None) -> pd.Series:
         """Extract data from database (or AlphaVantage), transform for training, and attach to self.data.
         
         Parameters
         -----------
         n_observations : int
             Number of observations to retrieve.
+        cache : ReturnsCache, optional
+            Cache of returns series. If given, returns are sliced from the cached series,
+            which is only extended with bars added since it was built.
         
         Returns
         --------
@@ -67,19 +124,21 @@ class GarchModel:
 
         # Add new data if required
         if self.use_new_data:
-            api = AlphaVantage()
-            new_data = api.get_daily(ticker=self.ticker)
-            self.repo.insert_table(
-                table_name=self.ticker, records=new_data, if_exists="replace"
-            )
+            self.sync_data()
+            if cache is not None and not settings.incremental_sync:
+                cache.invalidate(self.ticker)  # History was replaced, not appended to
 
-        # Pull data from database
-        df = self.repo.read_table(table_name=self.ticker, limit=n_observations + 1)
-        
-        # Calculate returns
-        df.sort_index(ascending=True, inplace=True)
-        df["return"] = df["close"].pct_change()  # Decimal returns for GARCH
-        self.data = df["return"].dropna().rename("return")
+        if cache is not None:
+            self.data = cache.get(repo=self.repo, ticker=self.ticker, n_observations=n_observations)
+        else:
+            # Pull data from database
+            df = self.repo.read_table(table_name=self.ticker, limit=n_observations + 1, columns=["close"])
+
+            # Calculate returns
+            with timed("model.pct_change"):
+                df.sort_index(ascending=True, inplace=True)
+                df["return"] = df["close"].pct_change()  # Decimal returns for GARCH
+                self.data = df["return"].dropna().rename("return")
         
         if len(self.data) < n_observations:
             raise ValueError(f"Requested {n_observations} returns, but only {len(self.data)} available")
@@ -108,10 +167,167 @@ class GarchModel:
             raise ValueError("No data available. Run wrangle_data first.")
         
         # Train model
-        self.model = arch_model(self.data, p=p, q=q, rescale=False).fit(disp=0)
+        with timed("model.fit"):
+            self.model = arch_model(self.data, p=p, q=q, rescale=False).fit(disp=0)
         self.aic = self.model.aic
         self.bic = self.model.bic
 
+    @timed("model.refit")
+    def refit(self, p: int, q: int, cache: "ModelCache" = None,
+              max_new_bars: int = settings.refit_max_new_bars,
+              threshold: float = settings.refit_loglik_threshold) -> str:
+        """Update the latest saved GARCH(p, q) model for self.ticker with self.data.
+
+        If at most `max_new_bars` bars were added since the saved model, self.data spans
+        about the same window as the saved model plus those bars (within `max_new_bars`
+        observations), and the average log-likelihood of the new bars under its parameters
+        is within `threshold` of the model's in-sample average, the model is not refit: its
+        conditional variance is rolled forward through the new bars. Otherwise the model is refit starting from the saved
+        parameters. Without a saved model of the same order this is a plain fit.
+        Attaches the result to self.model and assigns AIC and BIC.
+
+        Parameters
+        -----------
+        p : int
+            Lag order of the symmetric innovation.
+        q : int
+            Lag order of lagged volatility.
+        cache : ModelCache, optional
+            Cache used to load the saved model.
+        max_new_bars : int
+            Largest number of new bars that may skip refitting (default: settings.refit_max_new_bars).
+        threshold : float
+            Largest allowed change of the average log-likelihood per bar
+            (default: settings.refit_loglik_threshold).
+
+        Returns
+        --------
+        str
+            'rolled' (no refit), 'warm' (refit from saved parameters) or 'full' (plain fit).
+        """
+        if not hasattr(self, 'data') or self.data.empty:
+            raise ValueError("No data available. Run wrangle_data first.")
+        try:
+            self.load(cache=cache)
+            previous = self.model if isinstance(self.model, GarchState) else GarchState.from_result(self.model)
+        except (FileNotFoundError, ValueError):
+            previous = None
+        if previous is None or (previous.p, previous.q) != (p, q):
+            self.fit(p=p, q=q)
+            return "full"
+
+        new_data = self.data[self.data.index > previous.last_date]
+        # Rolling only extends the saved window, so once it drifts from the window of
+        # self.data (a different n_observations, or many rolls over a sliding window) refit
+        window_drift = abs(len(self.data) - (previous.nobs + len(new_data)))
+        if (self.data.index[-1] >= previous.last_date and len(new_data) <= max_new_bars
+                and window_drift <= max_new_bars):
+            rolled, loglikelihood = previous.roll_forward(new_data)
+            change = abs(loglikelihood.mean() - previous.loglikelihood / previous.nobs) if len(new_data) else 0.0
+            if change < threshold:
+                self.model = rolled
+                self.aic = rolled.aic
+                self.bic = rolled.bic
+                return "rolled"
+
+        with timed("model.fit"):
+            self.model = arch_model(self.data, p=p, q=q, rescale=False).fit(
+                disp=0, starting_values=np.asarray(previous.params)
+            )
+        self.aic = self.model.aic
+        self.bic = self.model.bic
+        return "warm"
+
+    @timed("model.select_order")
+    def select_order(self, max_p: int, max_q: int, criterion: str = "bic", n_jobs: int = 1,
+                     patience: int = 1) -> pd.DataFrame:
+        """Search GARCH(p, q) orders on self.data and attach the best model to self.model.
+
+        Candidates (1 <= p <= max_p, 0 <= q <= max_q) are fit in waves of equal p + q,
+        each wave in parallel. Every candidate is warm-started from the best fitted
+        neighbour of smaller order. The search stops early once `patience` consecutive
+        waves fail to improve the criterion. This is a heuristic: the remaining candidates
+        are reported as skipped, not ruled out, and one of them could still have scored
+        better. Assigns AIC and BIC of the winner.
+
+        Parameters
+        -----------
+        max_p : int
+            Largest lag order of the symmetric innovation.
+        max_q : int
+            Largest lag order of lagged volatility.
+        criterion : str
+            'aic' or 'bic' (default: 'bic').
+        n_jobs : int
+            Number of processes used within a wave (default: 1; -1 uses every CPU).
+        patience : int
+            Waves without improvement before stopping (default: 1).
+
+        Returns
+        --------
+        pd.DataFrame
+            Indexed by (p, q), with columns 'aic', 'bic', 'loglikelihood' and 'status'
+            ('fitted' or 'skipped' by early stopping), sorted by the criterion.
+        """
+        if not isinstance(max_p, int) or max_p < 1:
+            raise ValueError("max_p must be a positive integer")
+        if not isinstance(max_q, int) or max_q < 0:
+            raise ValueError("max_q must be a non-negative integer")
+        if criterion not in ["aic", "bic"]:
+            raise ValueError("criterion must be 'aic' or 'bic'")
+        if not isinstance(patience, int) or patience <= 0:
+            raise ValueError("patience must be a positive integer")
+        if not hasattr(self, 'data') or self.data.empty:
+            raise ValueError("No data available. Run wrangle_data first.")
+
+        returns = self.data.to_numpy(dtype="float64")
+        fitted = {}
+        best, stalled = None, 0
+        for order in range(1, max_p + max_q + 1):
+            wave = [(p, order - p) for p in range(1, max_p + 1) if 0 <= order - p <= max_q]
+            if not wave:
+                continue
+            jobs = [
+                (returns, p, q, _warm_start(fitted, p, q, criterion))
+                for p, q in wave
+            ]
+            if n_jobs == 1 or len(jobs) == 1:
+                results = [_fit_order(*job) for job in jobs]
+            else:
+                results = joblib.Parallel(n_jobs=n_jobs, max_nbytes=0)(
+                    joblib.delayed(_fit_order)(*job) for job in jobs
+                )
+            fitted.update({(r["p"], r["q"]): r for r in results})
+
+            wave_best = min(results, key=lambda r: r[criterion])
+            if best is None or wave_best[criterion] < best[criterion]:
+                best, stalled = wave_best, 0
+            else:
+                stalled += 1
+                if stalled >= patience:
+                    break
+
+        # Refit the winner on the original series; it starts at its optimum, so this is quick
+        self.model = arch_model(self.data, p=best["p"], q=best["q"], rescale=False).fit(
+            disp=0, starting_values=best["params"]
+        )
+        self.aic = self.model.aic
+        self.bic = self.model.bic
+
+        table = pd.DataFrame(
+            [
+                {
+                    "p": p, "q": q,
+                    "aic": fitted[(p, q)]["aic"] if (p, q) in fitted else np.nan,
+                    "bic": fitted[(p, q)]["bic"] if (p, q) in fitted else np.nan,
+                    "loglikelihood": fitted[(p, q)]["loglikelihood"] if (p, q) in fitted else np.nan,
+                    "status": "fitted" if (p, q) in fitted else "skipped"
+                }
+                for p in range(1, max_p + 1) for q in range(0, max_q + 1)
+            ]
+        ).set_index(["p", "q"])
+        return table.sort_values(criterion, na_position="last")
+
     def __clean_prediction(self, prediction: pd.DataFrame) -> dict:
         """Reformat model prediction to JSON.
         
@@ -152,11 +368,96 @@ class GarchModel:
         if not hasattr(self, 'model'):
             raise ValueError("No model available. Run fit first.")
         
-        prediction = self.model.forecast(horizon=horizon, reindex=False).variance
+        with timed("model.forecast"):
+            if isinstance(self.model, GarchState):
+                prediction = pd.DataFrame(
+                    self.model.forecast(horizon=horizon)[np.newaxis, :], index=[self.model.last_date]
+                )
+            else:
+                prediction = self.model.forecast(horizon=horizon, reindex=False).variance
         return self.__clean_prediction(prediction)
 
+    def backtest(self, test_size: int, refit_every: int = 1, p: int = 1, q: int = 1,
+                 n_jobs: int = 1) -> pd.DataFrame:
+        """Walk-forward validation of one-day-ahead volatility forecasts on the tail of self.data.
+
+        The model is refit every `refit_every` days, starting from the previous fit's
+        parameters. Between refits the variance recursion is rolled forward with fixed
+        parameters instead of refitting.
+        
+        Parameters
+        -----------
+        test_size : int
+            Number of most recent observations to forecast.
+        refit_every : int
+            Number of days between refits (default: 1, refit every day).
+        p : int
+            Lag order of the symmetric innovation (default: 1).
+        q : int
+            Lag order of lagged volatility (default: 1).
+        n_jobs : int
+            Number of processes. Refits are split into contiguous chunks, each warm-started
+            independently (default: 1).
+        
+        Returns
+        --------
+        pd.DataFrame
+            Indexed by test date, with columns 'return', 'volatility' (predicted), 'error'
+            (squared return minus predicted variance) and 'qlike' (QLIKE loss). Mean MSE,
+            MAE and QLIKE are stored in the frame's attrs["metrics"].
+        """
+        if not hasattr(self, 'data') or self.data.empty:
+            raise ValueError("No data available. Run wrangle_data first.")
+        if not isinstance(test_size, int) or not 0 < test_size < len(self.data):
+            raise ValueError("test_size must be a positive integer smaller than the number of observations")
+        if not isinstance(refit_every, int) or refit_every <= 0:
+            raise ValueError("refit_every must be a positive integer")
+        if not isinstance(p, int) or p < 1:
+            raise ValueError("p must be a positive integer")
+        if not isinstance(q, int) or q < 0:
+            raise ValueError("q must be a non-negative integer")
+        if not isinstance(n_jobs, int) or n_jobs <= 0:
+            raise ValueError("n_jobs must be a positive integer")
+
+        returns = self.data.to_numpy(dtype="float64")
+        test_start = len(returns) - test_size
+        origins = list(range(test_start, len(returns), refit_every))
+        chunks = [list(c) for c in np.array_split(origins, min(n_jobs, len(origins)))]
+
+        if len(chunks) == 1:
+            variance = _backtest_variance(returns, chunks[0], refit_every, p, q)
+        else:
+            parts = joblib.Parallel(n_jobs=len(chunks))(
+                joblib.delayed(_backtest_variance)(returns, chunk, refit_every, p, q) for chunk in chunks
+            )
+            variance = np.concatenate(parts)
+
+        realised = returns[test_start:]
+        error = realised ** 2 - variance
+        results = pd.DataFrame(
+            {
+                "return": realised,
+                "volatility": variance ** 0.5,
+                "error": error,
+                "qlike": np.log(variance) + realised ** 2 / variance
+            },
+            index=self.data.index[test_start:]
+        )
+        results.attrs["metrics"] = {
+            "mse": float(np.mean(error ** 2)),
+            "mae": float(np.mean(np.abs(error))),
+            "qlike": float(results["qlike"].mean())
+        }
+        return results
+
+    @timed("model.dump")
     def dump(self) -> str:
-        """Save model to self.model_directory with timestamp.
+        """Save compact state of the model (see GarchState) to self.model_directory with timestamp.
+
+        The model is recorded in the registry of self.repo, and forecasts up to
+        settings.forecast_max_horizon days are precomputed and stored there too, so
+        /predict can usually answer without loading the model. Older models beyond
+        settings.model_retention are then pruned.
         
         Returns
         -----------
@@ -166,16 +467,627 @@ class GarchModel:
         if not hasattr(self, 'model'):
             raise ValueError("No model to save. Run fit first.")
         
-        timestamp = pd.Timestamp.now().isoformat().replace(':', '-')  # Safe filename
-        filepath = os.path.join(self.model_directory, f"{timestamp}_{self.ticker}.pkl")
-        joblib.dump(self.model, filepath)
+        state = self.model if isinstance(self.model, GarchState) else GarchState.from_result(self.model)
+        timestamp = pd.Timestamp.now().isoformat()
+        filename = f"{timestamp.replace(':', '-')}_{self.ticker}.npy"  # Safe filename
+        filepath = os.path.join(self.model_directory, filename)
+        with timed("model.save"):
+            state.save(filepath)
+        stored = False
+        if settings.forecast_max_horizon > 0:
+            forecast = self.predict_volatility(horizon=settings.forecast_max_horizon)
+            result = self.repo.insert_forecast(ticker=self.ticker, forecast=forecast, model_path=filepath)
+            stored = result["transaction_successful"]
+        if not stored:
+            self.repo.delete_forecast(self.ticker)  # Never leave an older model's forecast behind
+        self.repo.register_model(
+            ticker=self.ticker,
+            path=filepath,
+            timestamp=timestamp,
+            p=state.p,
+            q=state.q,
+            aic=state.aic,
+            bic=state.bic,
+            n_obs=state.nobs
+        )
+        if settings.model_retention > 0:
+            self.prune(keep=settings.model_retention)
         return filepath
 
-    def load(self) -> None:
-        """Load most recent model in self.model_directory for self.ticker, attach to self.model."""
-        pattern = os.path.join(self.model_directory, f"*{self.ticker}.pkl")
-        try:
-            model_path = sorted(glob(pattern))[-1]
-            self.model = joblib.load(model_path)
-        except IndexError:
-            raise FileNotFoundError(f"No model found for '{self.ticker}' in {self.model_directory}")
\ No newline at end of file
+    def load(self, cache: "ModelCache" = None) -> None:
+        """Load most recent model in self.model_directory for self.ticker, attach to self.model.
+
+        Compact models are memory-mapped as a GarchState. Models pickled by earlier
+        versions are loaded as full arch results.
+
+        Parameters
+        -----------
+        cache : ModelCache, optional
+            Cache of loaded models. If the most recent model for self.ticker is already
+            cached it is reused instead of being read from disk.
+        """
+        model_path = self.repo.latest_model_path(self.ticker)
+        if model_path is None:
+            # Fall back to models saved before the registry existed
+            pattern = os.path.join(self.model_directory, f"*{self.ticker}.pkl")
+            try:
+                model_path = sorted(glob(pattern))[-1]
+            except IndexError:
+                raise FileNotFoundError(f"No model found for '{self.ticker}' in {self.model_directory}")
+
+        if cache is not None:
+            cached = cache.get(self.ticker, model_path)
+            if cached is not None:
+                self.model = cached
+                return
+
+        with timed("model.load"):
+            if model_path.endswith(".npy"):
+                self.model = GarchState.load(model_path)
+            else:
+                self.model = joblib.load(model_path)
+        if cache is not None:
+            cache.put(self.ticker, model_path, self.model)
+
+    def prune(self, keep: int) -> list:
+        """Delete all but the `keep` most recent registered models for self.ticker.
+
+        Unregistered models pickled by earlier versions are deleted too, once they are
+        older than the latest registered model.
+
+        Parameters
+        -----------
+        keep : int
+            Number of most recent models to keep.
+
+        Returns
+        --------
+        list
+            Filepaths of the models removed.
+        """
+        removed = self.repo.prune_models(ticker=self.ticker, keep=keep)
+        latest = self.repo.latest_model_path(self.ticker)
+        if latest is not None:
+            # Filenames start with the save timestamp, so they sort by age
+            pattern = os.path.join(self.model_directory, f"*_{self.ticker}.pkl")
+            removed += [
+                path for path in sorted(glob(pattern))
+                if os.path.basename(path) < os.path.basename(latest)
+            ]
+        for path in removed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+class GarchState:
+    """Compact, fixed-layout representation of a fitted constant-mean GARCH(p, q) model.
+
+    Holds only what forecasting needs: the parameters, the last p residuals and the
+    last q conditional variances, plus fit statistics. Everything is packed in a single
+    float64 vector saved as .npy, so loading is a memory map instead of unpickling.
+
+    Layout: [version, p, q, last_date (days since epoch), nobs, loglikelihood, aic, bic,
+    mu, omega, alpha[1..p], beta[1..q], resid[T-p+1..T], sigma2[T-q+1..T]].
+
+    Attributes
+    -----------
+    vector : np.ndarray
+        Packed state, possibly a read-only memory map.
+    """
+    VERSION = 1
+    HEADER_SIZE = 8
+
+    def __init__(self, vector: np.ndarray):
+        if vector.ndim != 1 or len(vector) < self.HEADER_SIZE or vector[0] != self.VERSION:
+            raise ValueError("Not a compact GARCH model")
+        self.vector = vector
+        self.p = int(vector[1])
+        self.q = int(vector[2])
+        if len(vector) != self.HEADER_SIZE + 2 + 2 * (self.p + self.q):
+            raise ValueError("Compact GARCH model has an invalid length")
+
+    @classmethod
+    def from_result(cls, result) -> "GarchState":
+        """Build state from an arch ARCHModelResult of a constant-mean GARCH model."""
+        volatility = result.model.volatility
+        if (result.params.index[0] != "mu" or type(volatility).__name__ != "GARCH"
+                or volatility.o or volatility.power != 2.0):
+            raise ValueError("Only constant-mean GARCH(p, q) models can be stored in compact form")
+        p, q = volatility.p, volatility.q
+        resid = np.asarray(result.resid)
+        sigma2 = np.asarray(result.conditional_volatility) ** 2
+        last_date = pd.Timestamp(result.resid.index[-1]).to_datetime64().astype("datetime64[D]")
+        header = [
+            cls.VERSION, p, q, last_date.astype("int64"),
+            result.nobs, result.loglikelihood, result.aic, result.bic
+        ]
+        vector = np.concatenate([
+            np.asarray(header, dtype="float64"),
+            result.params.to_numpy(dtype="float64"),
+            resid[len(resid) - p:],
+            sigma2[len(sigma2) - q:]
+        ])
+        return cls(vector)
+
+    @classmethod
+    def load(cls, path: str) -> "GarchState":
+        """Memory-map state saved by save()."""
+        return cls(np.load(path, mmap_mode="r"))
+
+    def save(self, path: str) -> None:
+        """Write state to path in .npy format."""
+        np.save(path, np.asarray(self.vector, dtype="float64"), allow_pickle=False)
+
+    @property
+    def last_date(self) -> pd.Timestamp:
+        return pd.Timestamp(np.datetime64(int(self.vector[3]), "D"))
+
+    @property
+    def nobs(self) -> int:
+        return int(self.vector[4])
+
+    @property
+    def loglikelihood(self) -> float:
+        return float(self.vector[5])
+
+    @property
+    def aic(self) -> float:
+        return float(self.vector[6])
+
+    @property
+    def bic(self) -> float:
+        return float(self.vector[7])
+
+    @property
+    def params(self) -> np.ndarray:
+        """[mu, omega, alpha[1..p], beta[1..q]]"""
+        start = self.HEADER_SIZE
+        return self.vector[start:start + 2 + self.p + self.q]
+
+    @property
+    def resid(self) -> np.ndarray:
+        """Last p residuals, most recent last."""
+        start = self.HEADER_SIZE + 2 + self.p + self.q
+        return self.vector[start:start + self.p]
+
+    @property
+    def sigma2(self) -> np.ndarray:
+        """Last q conditional variances, most recent last."""
+        start = self.HEADER_SIZE + 2 + 2 * self.p + self.q
+        return self.vector[start:start + self.q]
+
+    def forecast(self, horizon: int) -> np.ndarray:
+        """Analytic variance forecast for the next `horizon` days."""
+        return forecast_variance_batch([self], horizon=horizon)[0]
+
+    def roll_forward(self, returns: pd.Series, last_date: pd.Timestamp = None) -> tuple:
+        """Run the variance recursion through new returns with the parameters unchanged.
+
+        Parameters
+        -----------
+        returns : pd.Series or np.ndarray
+            Returns observed after self.last_date, oldest first.
+        last_date : pd.Timestamp, optional
+            Date of the last of those returns (default: the last index label of `returns`,
+            which must then be a Series). Ignored if there are no returns.
+
+        Returns
+        --------
+        tuple
+            (GarchState with updated terminal state, date, nobs, log-likelihood, AIC and
+            BIC; normal log-likelihood of each new return).
+        """
+        if len(returns) and last_date is None:
+            if not isinstance(returns, pd.Series):
+                raise ValueError("last_date is required unless returns is a Series")
+            last_date = returns.index[-1]
+        returns = np.asarray(returns, dtype="float64")
+        params = np.asarray(self.params)
+        mu, omega, alpha, beta = params[0], params[1], params[2:2 + self.p], params[2 + self.p:]
+        resid = list(np.asarray(self.resid))
+        sigma2 = list(np.asarray(self.sigma2))
+        loglikelihood = np.empty(len(returns))
+        for i, value in enumerate(returns):
+            variance = omega
+            if self.p:
+                variance += alpha @ (np.asarray(resid[-self.p:][::-1]) ** 2)
+            if self.q:
+                variance += beta @ np.asarray(sigma2[-self.q:][::-1])
+            resid.append(value - mu)
+            sigma2.append(variance)
+            loglikelihood[i] = -0.5 * (np.log(2 * np.pi) + np.log(variance) + (value - mu) ** 2 / variance)
+
+        vector = np.array(self.vector, dtype="float64")
+        if len(returns):
+            n_params = len(params)
+            nobs = self.nobs + len(returns)
+            total = self.loglikelihood + loglikelihood.sum()
+            vector[3] = pd.Timestamp(last_date).to_datetime64().astype("datetime64[D]").astype("int64")
+            vector[4:8] = [nobs, total, -2 * total + 2 * n_params, -2 * total + n_params * np.log(nobs)]
+            start = self.HEADER_SIZE + n_params
+            vector[start:start + self.p] = resid[len(resid) - self.p:]
+            vector[start + self.p:] = sigma2[len(sigma2) - self.q:]
+        return GarchState(vector), loglikelihood
+
+def forecast_variance_batch(states: list, horizon: int) -> np.ndarray:
+    """Analytic multi-step variance forecasts for many GARCH models in one vectorised pass.
+
+    Parameters and terminal states are stacked into arrays, zero-padded to the largest
+    p and q, and the GARCH recursion is run once per forecast step for all models.
+
+    Parameters
+    -----------
+    states : list of GarchState
+        Models to forecast.
+    horizon : int
+        Forecast horizon.
+
+    Returns
+    --------
+    np.ndarray
+        Variance forecasts of shape (len(states), horizon).
+    """
+    if not isinstance(horizon, int) or horizon <= 0:
+        raise ValueError("horizon must be a positive integer")
+    n = len(states)
+    max_p = max((state.p for state in states), default=0)
+    max_q = max((state.q for state in states), default=0)
+
+    # Column i holds lag i + 1; padding coefficients are zero so padded lags have no effect
+    omega = np.empty(n)
+    alpha, resid2 = np.zeros((n, max_p)), np.zeros((n, max_p))
+    beta, sigma2 = np.zeros((n, max_q)), np.zeros((n, max_q))
+    for i, state in enumerate(states):
+        params = state.params
+        omega[i] = params[1]
+        alpha[i, :state.p] = params[2:2 + state.p]
+        beta[i, :state.q] = params[2 + state.p:]
+        resid2[i, :state.p] = np.asarray(state.resid)[::-1] ** 2
+        sigma2[i, :state.q] = np.asarray(state.sigma2)[::-1]
+
+    variance = np.empty((n, horizon))
+    for h in range(horizon):
+        step = omega + (alpha * resid2).sum(axis=1) + (beta * sigma2).sum(axis=1)
+        variance[:, h] = step
+        # Beyond one step the expected squared residual is the forecast variance
+        if max_p:
+            resid2 = np.column_stack([step, resid2[:, :-1]])
+        if max_q:
+            sigma2 = np.column_stack([step, sigma2[:, :-1]])
+    return variance
+
+
+@timed("model.forecast_batch")
+def predict_volatility_batch(states: dict, horizon: int = 5) -> dict:
+    """Volatility forecasts for many tickers, formatted like GarchModel.predict_volatility.
+
+    Parameters
+    -----------
+    states : dict
+        Maps ticker to its GarchState.
+    horizon : int
+        Forecast horizon (default: 5).
+
+    Returns
+    --------
+    dict
+        Maps ticker to a forecast dict whose keys are dates in ISO 8601 format and
+        values are volatility.
+    """
+    tickers = list(states)
+    variance = forecast_variance_batch([states[t] for t in tickers], horizon=horizon)
+    volatility = (variance ** 0.5).round(3)
+
+    # Most tickers share their last trading day, so build each date index once
+    date_index = {}
+    forecasts = {}
+    for ticker, row in zip(tickers, volatility):
+        last_date = states[ticker].last_date
+        if last_date not in date_index:
+            start = last_date + pd.DateOffset(days=1)
+            date_index[last_date] = [d.isoformat() for d in pd.bdate_range(start=start, periods=horizon)]
+        forecasts[ticker] = dict(zip(date_index[last_date], row.tolist()))
+    return forecasts
+
+
+def _backtest_variance(returns: np.ndarray, origins: list, refit_every: int, p: int, q: int) -> np.ndarray:
+    """One-day-ahead variance forecasts for the windows starting at each origin.
+
+    The model is refit on returns[:origin] at every origin, warm-started from the
+    previous origin's parameters, and the GARCH recursion is then rolled through the
+    next `refit_every` observations with those parameters.
+    """
+    forecasts = []
+    starting_values = None
+    for origin in origins:
+        result = arch_model(returns[:origin], p=p, q=q, rescale=False).fit(
+            disp=0, starting_values=starting_values
+        )
+        params = result.params.to_numpy()
+        starting_values = params
+        mu, omega, alpha, beta = params[0], params[1], params[2:2 + p], params[2 + p:]
+
+        stop = min(origin + refit_every, len(returns))
+        # Squared residuals and conditional variances, most recent last
+        resid2 = list((returns[origin - p:stop] - mu) ** 2)
+        sigma2 = list(result.conditional_volatility[len(result.conditional_volatility) - q:] ** 2) if q else []
+        for i in range(stop - origin):
+            variance = omega + alpha @ resid2[i:i + p][::-1]
+            if q:
+                variance += beta @ np.asarray(sigma2[-q:][::-1])
+            sigma2.append(variance)
+            forecasts.append(variance)
+    return np.asarray(forecasts)
+
+
+def _fit_order(returns: np.ndarray, p: int, q: int, starting_values: np.ndarray = None) -> dict:
+    """Fit one GARCH(p, q) candidate and return its parameters and fit statistics."""
+    result = arch_model(returns, p=p, q=q, rescale=False).fit(disp=0, starting_values=starting_values)
+    return {
+        "p": p,
+        "q": q,
+        "params": result.params.to_numpy() if hasattr(result.params, "to_numpy") else np.asarray(result.params),
+        "aic": float(result.aic),
+        "bic": float(result.bic),
+        "loglikelihood": float(result.loglikelihood)
+    }
+
+
+def _warm_start(fitted: dict, p: int, q: int, criterion: str) -> np.ndarray:
+    """Starting values for GARCH(p, q) from the best fitted (p - 1, q) or (p, q - 1) candidate.
+
+    The parent's coefficients are kept, a small coefficient is added for the new lag and
+    alpha + beta is scaled back below one if needed. Returns None if no parent was fitted.
+    """
+    parents = [fitted[key] for key in [(p - 1, q), (p, q - 1)] if key in fitted]
+    if not parents:
+        return None
+    parent = min(parents, key=lambda r: r[criterion])
+    params = parent["params"]
+    alpha = list(params[2:2 + parent["p"]]) + [0.01] * (p - parent["p"])
+    beta = list(params[2 + parent["p"]:]) + [0.01] * (q - parent["q"])
+    persistence = sum(alpha) + sum(beta)
+    scale = 0.98 / persistence if persistence >= 0.98 else 1.0
+    return np.array([params[0], params[1]] + [a * scale for a in alpha] + [b * scale for b in beta])
+
+
+def fit_and_dump(ticker: str, use_new_data: bool, n_observations: int, p: int, q: int,
+                 warm_start: bool = False) -> dict:
+    """Run the wrangle/fit/dump pipeline for one ticker in its own database connection.
+
+    Intended as the unit of work for a process pool, so it only takes and returns
+    picklable values and never raises.
+
+    Parameters
+    -----------
+    ticker : str
+        Ticker symbol of the equity.
+    use_new_data : bool
+        Whether to download new data from AlphaVantage.
+    n_observations : int
+        Number of observations for training.
+    p : int
+        Lag order of the symmetric innovation.
+    q : int
+        Lag order of lagged volatility.
+    warm_start : bool
+        Whether to update the latest saved model with GarchModel.refit instead of fitting
+        from scratch (default: False).
+
+    Returns
+    --------
+    dict
+        Keys 'ticker', 'success', 'message' and 'seconds' (wall time of the pipeline).
+    """
+    start = time.perf_counter()
+    connection = sqlite3.connect(settings.db_name, timeout=settings.db_busy_timeout)
+    try:
+        model = GarchModel(ticker=ticker, repo=build_repository(connection=connection), use_new_data=use_new_data)
+        model.wrangle_data(n_observations=n_observations)
+        if warm_start:
+            mode = model.refit(p=p, q=q)
+            filename = model.dump()
+            success, message = True, f"Updated ({mode}) and saved to '{filename}'."
+        else:
+            model.fit(p=p, q=q)
+            filename = model.dump()
+            success, message = True, f"Trained and saved to '{filename}'."
+    except Exception as e:
+        success, message = False, str(e)
+    finally:
+        connection.close()
+    return {
+        "ticker": ticker,
+        "success": success,
+        "message": message,
+        "seconds": round(time.perf_counter() - start, 4)
+    }
+
+
+class ModelCache:
+    """Thread-safe LRU cache of trained models keyed by ticker.
+
+    Each entry remembers the file it was loaded from. A lookup with a different
+    path (e.g. after /fit dumped a newer model) is a miss, so stale models are
+    never served.
+
+    Attributes
+    -----------
+    max_entries : int
+        Maximum number of models held in memory before the least recently used is evicted.
+    hits : int
+        Number of lookups served from the cache.
+    misses : int
+        Number of lookups that had to load from disk.
+    evictions : int
+        Number of entries dropped to respect max_entries.
+    """
+    def __init__(self, max_entries: int = 64):
+        if not isinstance(max_entries, int) or max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # ticker -> (model_path, model)
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str, model_path: str):
+        """Return cached model for ticker if it was loaded from model_path, else None."""
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None or entry[0] != model_path:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(ticker)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, ticker: str, model_path: str, model) -> None:
+        """Store model for ticker, evicting least recently used entries if needed."""
+        with self._lock:
+            self._entries[ticker] = (model_path, model)
+            self._entries.move_to_end(ticker)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, ticker: str = None) -> None:
+        """Drop cached model for ticker, or every entry if ticker is None."""
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(ticker, None)
+
+    def stats(self) -> dict:
+        """Return cache size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class ReturnsCache:
+    """Thread-safe LRU cache of returns series keyed by ticker.
+
+    Each entry is checked against the latest date in the repository. When new bars have
+    been stored since, only those bars are read and their returns appended, so fitting
+    many specifications on the same ticker never recomputes the whole series.
+
+    Attributes
+    -----------
+    max_entries : int
+        Maximum number of series held in memory before the least recently used is evicted.
+    hits : int
+        Number of lookups served entirely from the cache.
+    extensions : int
+        Number of lookups served after appending newly stored bars.
+    misses : int
+        Number of lookups that had to read and compute the series.
+    """
+    def __init__(self, max_entries: int = 64):
+        if not isinstance(max_entries, int) or max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.extensions = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # ticker -> (returns, last_close)
+        self._lock = threading.Lock()
+
+    def get(self, repo: SQLRepository, ticker: str, n_observations: int) -> pd.Series:
+        """Return the last n_observations returns of ticker (fewer if not enough are stored).
+
+        Parameters
+        -----------
+        repo : SQLRepository
+            Repository holding the prices.
+        ticker : str
+            Ticker symbol of the equity.
+        n_observations : int
+            Number of returns wanted.
+
+        Returns
+        --------
+        pd.Series
+            Equity returns named 'return' (decimal form, no NaN values), sorted by date.
+        """
+        latest = repo.latest_date(ticker)
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is not None:
+                self._entries.move_to_end(ticker)
+        returns = self.__refresh(repo, ticker, entry, latest, n_observations)
+        return returns.iloc[-n_observations:]
+
+    def __refresh(self, repo: SQLRepository, ticker: str, entry: tuple, latest: pd.Timestamp,
+                  n_observations: int) -> pd.Series:
+        """Bring a cached entry up to date with the repository, rebuilding it if needed."""
+        if entry is not None and len(entry[0]) >= n_observations:
+            returns, last_close = entry
+            last_date = returns.index[-1] if len(returns) else None
+            if last_date == latest:
+                with self._lock:
+                    self.hits += 1
+                return returns
+            if latest is not None and last_date is not None and latest > last_date:
+                # Enough bars to reach back to the cached last date; holidays only make it fewer
+                n_new = len(pd.bdate_range(start=last_date, end=latest))
+                closes = repo.read_table(table_name=ticker, limit=n_new, columns=["close"])["close"]
+                closes = closes.sort_index()
+                if closes.index[0] <= last_date:
+                    closes = closes[closes.index > last_date]
+                    with timed("model.pct_change"):
+                        new_returns = pd.concat(
+                            [pd.Series([last_close], index=[last_date]), closes]
+                        ).pct_change().iloc[1:].dropna()
+                    returns = pd.concat([returns, new_returns]).rename("return")
+                    returns.index.name = "date"
+                    self.__store(ticker, returns, float(closes.iloc[-1]))
+                    with self._lock:
+                        self.extensions += 1
+                    return returns
+
+        # Not cached, too short, or the stored history changed: rebuild
+        df = repo.read_table(table_name=ticker, limit=n_observations + 1, columns=["close"])
+        with timed("model.pct_change"):
+            df.sort_index(ascending=True, inplace=True)
+            returns = df["close"].pct_change().dropna().rename("return")
+        self.__store(ticker, returns, float(df["close"].iloc[-1]) if len(df) else None)
+        with self._lock:
+            self.misses += 1
+        return returns
+
+    def __store(self, ticker: str, returns: pd.Series, last_close: float) -> None:
+        with self._lock:
+            self._entries[ticker] = (returns, last_close)
+            self._entries.move_to_end(ticker)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ticker: str = None) -> None:
+        """Drop cached series for ticker, or every entry if ticker is None."""
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(ticker, None)
+
+    def stats(self) -> dict:
+        """Return cache size and hit/extension/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "extensions": self.extensions,
+                "misses": self.misses
+            }
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""Bounded thread pools for running blocking work outside the asyncio event loop.
+Jobs beyond a pool's worker and queue limits are rejected instead of piling up.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class PoolFullError(RuntimeError):
+    """Raised when a WorkerPool or Admission has no free slot for a new job."""
+
+class Admission:
+    def __init__(self, name: str, capacity: int):
+        """Initialize a counter of jobs in flight on an executor that has no limit of its own.
+
+        Args:
+            name (str): Name used in error messages.
+            capacity (int): Number of jobs that can be running or waiting at the same time.
+
+        Raises:
+            ValueError: If capacity is not positive.
+        """
+        if not isinstance(capacity, int) or capacity <= 0:
+            raise ValueError("capacity must be a positive integer")
+        self.name = name
+        self.capacity = capacity
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int = 1) -> None:
+        """Reserve n slots at once, or none of them.
+
+        Raises:
+            PoolFullError: If fewer than n slots are free.
+        """
+        with self._lock:
+            if self.in_flight + n > self.capacity:
+                raise PoolFullError(
+                    f"The {self.name} pool is busy ({self.in_flight} of {self.capacity} jobs in flight). "
+                    f"Try again later."
+                )
+            self.in_flight += n
+
+    def release(self, n: int = 1) -> None:
+        """Free n slots."""
+        with self._lock:
+            self.in_flight -= n
+
+class WorkerPool:
+    def __init__(self, name: str, max_workers: int, max_queue: int = 0):
+        """Initialize a thread pool with a hard cap on running plus waiting jobs.
+
+        Args:
+            name (str): Name of the pool, used for thread names and error messages.
+            max_workers (int): Number of jobs that can run at the same time.
+            max_queue (int): Number of extra jobs allowed to wait for a free worker. Defaults to 0.
+
+        Raises:
+            ValueError: If max_workers is not positive or max_queue is negative.
+        """
+        if not isinstance(max_workers, int) or max_workers <= 0:
+            raise ValueError("max_workers must be a positive integer")
+        if not isinstance(max_queue, int) or max_queue < 0:
+            raise ValueError("max_queue must be a non-negative integer")
+        self.name = name
+        self.capacity = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.capacity)
+
+    async def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the pool and wait for its result.
+
+        Returns:
+            The return value of func.
+
+        Raises:
+            PoolFullError: If the pool is already at capacity.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PoolFullError(f"The {self.name} pool is busy ({self.capacity} jobs in flight). Try again later.")
+
+        # The slot is released by the worker thread itself, so a cancelled request
+        # keeps counting against capacity until its job has really finished
+        context = contextvars.copy_context()
+
+        def job():
+            try:
+                return context.run(func, *args, **kwargs)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._executor.submit(job)
+        except Exception:
+            self._slots.release()
+            raise
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """Stop accepting jobs and wait for running ones to finish."""
+        self._executor.shutdown(wait=True)